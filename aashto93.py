@@ -1,5 +1,4 @@
 import numpy as np
-from scipy.optimize import fsolve
 
 def predict_pavement_esal(z, so, sn, psi, mr):
     """
@@ -15,15 +14,141 @@ def predict_pavement_esal(z, so, sn, psi, mr):
     Returns:
     float: the predicted ESAL value
     """
-    right_side = z*so+9.36*np.log10(sn+1)-0.2*(np.log10(psi/(4.2-1.5))/(0.4+1094/(sn+1)**0.519))+2.32*np.log10(mr)-8.07
-    esals = 10**right_side
+    esals = 10**predict_pavement_log_esal(z, so, sn, psi, mr)
     return esals
 
-def solve_sn(z, so, psi, mr, esal):
+def predict_pavement_log_esal(z, so, sn, psi, mr):
+    # log10 of predict_pavement_esal
+    return z*so+9.36*np.log10(sn+1)-0.2*(np.log10(psi/(4.2-1.5))/(0.4+1094/(sn+1)**0.519))+2.32*np.log10(mr)-8.07
+
+def predict_pavement_esal_derivative(z, so, sn, psi, mr):
+    """
+    Derivative of predict_pavement_esal with respect to the structural number.
+
+    Parameters:
+    z (float): standard deviation (usually 0.5-0.999)
+    so (float): standard error (usually 0.4-0.5 for asphalt, 0.35-0.4 for concrete)
+    sn (float): structural number
+    psi (float): allowable delta in serviceability index (usually 1.0-3.0)
+    mr (float): resilient modulus
+
+    Returns:
+    float: d(ESAL)/d(SN)
+    """
+    esals = predict_pavement_esal(z, so, sn, psi, mr)
+    return esals*np.log(10)*_log_esal_slope(sn, psi)
+
+def _log_esal_slope(sn, psi):
+    # d/d(sn) of log10(predict_pavement_esal)
+    denominator = 0.4+1094/(sn+1)**0.519
+    denominator_slope = -0.519*1094/(sn+1)**1.519
+    return 9.36/((sn+1)*np.log(10))+0.2*np.log10(psi/(4.2-1.5))*denominator_slope/denominator**2
+
+def solve_sn(z, so, psi, mr, esal, full_output=False):
+    """
+    Solve predict_pavement_esal for the structural number that carries the given ESAL.
+
+    Scalar inputs use solve_sn_scalar, falling back to fsolve if it does not converge.
+    Arrays are broadcast against each other and solved together with solve_sn_array.
+    Only the fallback loads SciPy.
+
+    Returns:
+    float or ndarray: structural number, plus a converged flag (per element) if full_output is set
+    """
+    if all(np.ndim(v) == 0 for v in (z, so, psi, mr, esal)):
+        sn, converged = solve_sn_scalar(z, so, psi, mr, esal)
+        if not converged:
+            sn, converged = _solve_sn_fsolve(z, so, psi, mr, esal)
+        return (sn, converged) if full_output else sn
+    sn, converged = solve_sn_array(z, so, psi, mr, esal)
+    return (sn, converged) if full_output else sn
+
+def solve_sn_scalar(z, so, psi, mr, esal, tol=1e-10, max_iter=50, bounds=(-0.999, 100.0)):
+    """
+    solve_sn_array for a single set of inputs, without the array overhead.
+
+    Returns:
+    tuple: (sn, converged)
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        target = np.log10(esal)
+        sn = 3.0
+        lo, hi = bounds
+        for _ in range(max_iter):
+            residual = predict_pavement_log_esal(z, so, sn, psi, mr) - target
+            lo, hi, step, converged = _newton_step(sn, residual, _log_esal_slope(sn, psi), lo, hi, tol)
+            if converged:
+                return float(sn), True
+            sn = sn + step
+    return float(sn), False
+
+def _newton_step(sn, residual, slope, lo, hi, tol):
+    """
+    One safeguarded Newton step of the SN solvers, on scalars or arrays.
+
+    The bracket [lo, hi] is narrowed by the sign of the residual (log10 ESAL), and a
+    bisection step is taken whenever Newton would leave it. A stalled step only counts as
+    converged near a root, not where the bracket closed on a bound.
+
+    Returns:
+    tuple: (lo, hi, step, converged)
+    """
+    lo = _where(residual < 0, sn, lo)
+    hi = _where(residual > 0, sn, hi)
+    newton = sn - residual/slope
+    step = _where((newton > lo) & (newton < hi), newton, (lo+hi)/2) - sn
+    converged = (abs(residual) < tol) | ((abs(step) < tol*(1+abs(sn))) & (abs(residual) < tol**0.5))
+    return lo, hi, step, converged
+
+def _where(condition, a, b):
+    # np.where that keeps scalars as Python numbers, which the scalar solver relies on for speed
+    if isinstance(condition, np.ndarray):
+        return np.where(condition, a, b)
+    return a if condition else b
+
+def _solve_sn_fsolve(z, so, psi, mr, esal):
+    from scipy.optimize import fsolve
+
     def f(sn):
         val = sn[0]
         return predict_pavement_esal(z, so, val, psi, mr) - esal
-    return fsolve(f, np.array([3]))[0]
+    sn, _info, ier, _msg = fsolve(f, np.array([3]), full_output=True)
+    # fsolve can report success while stalled at the guess for large ESALs
+    converged = ier == 1 and np.isclose(predict_pavement_esal(z, so, sn[0], psi, mr), esal, rtol=1e-6)
+    return sn[0], converged
+
+def solve_sn_array(z, so, psi, mr, esal, tol=1e-10, max_iter=50, bounds=(-0.999, 100.0)):
+    """
+    Vectorized structural number solver.
+
+    Newton's method on log10(ESAL) using the analytic slope, starting from SN 3 (the fsolve
+    guess). Each element keeps a bracket from the sign of its residual and takes a bisection
+    step whenever Newton would leave it.
+
+    Parameters:
+    z, so, psi, mr, esal (array_like): inputs of predict_pavement_esal, broadcast together
+    tol (float): convergence tolerance on the SN step and on the log10(ESAL) residual
+    max_iter (int): iteration limit
+    bounds (tuple): initial SN bracket
+
+    Returns:
+    tuple: (sn, converged) arrays in the broadcast shape
+    """
+    z, so, psi, mr, esal = np.broadcast_arrays(*[np.asarray(v, dtype=float) for v in (z, so, psi, mr, esal)])
+    sn = np.full(z.shape, 3.0)
+    lo = np.full(z.shape, bounds[0])
+    hi = np.full(z.shape, bounds[1])
+    converged = np.zeros(z.shape, dtype=bool)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        target = np.log10(esal)
+        for _ in range(max_iter):
+            residual = predict_pavement_log_esal(z, so, sn, psi, mr) - target
+            lo, hi, step, done = _newton_step(sn, residual, _log_esal_slope(sn, psi), lo, hi, tol)
+            converged |= done
+            sn = np.where(converged, sn, sn+step)
+            if converged.all():
+                break
+    return sn, converged
 
 def serviceability_loss_factor(pt):
     return np.log10((4.2-pt)/(4.2-1.5))
@@ -42,10 +167,19 @@ def flexible_equivalent_single_axle_load(weight, axles, pt, sn):
     return factor**-1
 
 def total_trips(adt, years, growth):
-    base_trips = np.full(years, 365*adt)
-    years = np.arange(years)
-    growth = np.array([(1+growth)**y for y in years])
-    return np.sum(base_trips*growth)
+    """
+    Trips over the service life, with traffic growing at a constant annual rate.
+
+    The sum of 365*adt*(1+growth)**y over years 0 to years-1, in closed form so arrays of
+    segments can be passed.
+    """
+    return 365*adt*geometric_sum(growth, years)
+
+def geometric_sum(rate, years):
+    # sum of (1+rate)**y for y in 0..years-1, years for a rate of 0
+    rate = np.asarray(rate, dtype=float)
+    safe_rate = np.where(rate == 0, 1.0, rate)
+    return np.where(rate == 0, years, np.expm1(years*np.log1p(rate))/safe_rate)[()]
 
 def trips_to_esals(trips, direction_factor, lane_factor, equivalent_load):
     return direction_factor*lane_factor*equivalent_load*trips
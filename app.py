@@ -1,17 +1,77 @@
 from viktor import ViktorController
+from viktor.errors import UserError
 from viktor.result import OptimizationResult, OptimizationResultElement
 from viktor.views import DataView, DataGroup, DataItem, DataResult, PlotlyView, PlotlyResult, WebView, WebResult
 from viktor.parametrization import ViktorParametrization, Step, TextField, NumberField, OptionField, Table, \
-    OptimizationButton
-
-from plotly.subplots import make_subplots
-import plotly.graph_objects as go
+    OptimizationButton, IsEqual, Lookup
 
 import aashto93
+import loadspectrum
+import plotpayload
+import resultcache
+import solveprofile
 import solvesection
+import solvesession
 
+import json
+import logging
+import os
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
+# shared by the Step 4 views; set PAVEMENT_DESIGNER_CACHE to a directory to keep results across restarts
+solve_cache = resultcache.ResultCache(max_entries=64, max_bytes=64 * 2**20,
+                                      directory=os.environ.get("PAVEMENT_DESIGNER_CACHE"))
+# part of every solve_cache key; bump it when cached results change shape or meaning
+CACHE_VERSION = 1
+# stack fits of this worker, so single-field edits in Step 3/4 only refit what they affect
+solve_session = solvesession.SolveSession()
+
+
+def solve_sections(materials, goal_sn, profile, embankment, excavation):
+    # every solved section, ordered by cost
+    return _solved(materials, goal_sn, profile, embankment, excavation)[0]
+
+
+def solve_diagnostics(materials, goal_sn, profile, embankment, excavation):
+    # stage times and counts recorded when the sections were solved
+    return _solved(materials, goal_sn, profile, embankment, excavation)[1]
+
+
+def check_materials(materials, excavation):
+    # a material cheaper than the excavation credit has no cheapest section
+    try:
+        solvesection.check_cost_bounded(solvesection.make_material_list(materials), excavation)
+    except ValueError as error:
+        raise UserError(str(error)) from None
+
+
+def _solved(materials, goal_sn, profile, embankment, excavation):
+    check_materials(materials, excavation)
+
+    def compute():
+        solver_profile = solveprofile.SolveProfile()
+        sections = solve_session.solve(materials, goal_sn, profile, embankment, excavation, top_n=None,
+                                       profile=solver_profile)
+        logger.info("solve profile %s", json.dumps(solver_profile.as_dict()))
+        return sections, solver_profile.as_dict()
+    key = resultcache.make_key(CACHE_VERSION, "solve", materials, goal_sn, profile, embankment, excavation)
+    return solve_cache.get_or_compute(key, compute)
+
+
+FRONTIER_SN = [round(2.0 + 0.1 * i, 1) for i in range(61)]
+# most sections drawn as individual points in the optimization graph
+GRAPH_POINT_BUDGET = 1500
+
+
+def cost_frontier(materials, profile, embankment, excavation):
+    # cheapest section for each required SN in FRONTIER_SN
+    check_materials(materials, excavation)
+    key = resultcache.make_key(CACHE_VERSION, "frontier", materials, FRONTIER_SN, profile, embankment, excavation)
+    return solve_cache.get_or_compute(
+        key, lambda: solvesection.solve_frontier(materials, FRONTIER_SN, profile, embankment, excavation))
+
 class Parametrization(ViktorParametrization):
     step_1 = Step("Step 1: Traffic Conditions", views=["show_traffic_results"])
     step_1.name = TextField("Road Name")
@@ -26,7 +86,11 @@ Typical ranges:
     step_1.distribution = NumberField("Directional Distribution (%)", default=50, description="Typically 50% unless there is a difference between inbound/outbound trips")
     step_1.lane_distribution = NumberField("Lane Distribution (%)", default=100, description="Typically 100% unless there are multiple lanes")
     step_1.trucks = NumberField("Percentage of Trucks (%)", default=5, description="Commercial truck traffic. Typically less than 5% except for highways and freeways")
+    step_1.traffic_input = OptionField("Truck Traffic Input", options=["Load Equivalent Factor", "Axle Load Spectrum"],
+                                       default="Load Equivalent Factor",
+                                       description="Use a single LEF for all trucks or axle load counts (e.g. from weigh-in-motion data)")
     step_1.lef = NumberField("Load Equivalent Factor", default=1.0,
+                             visible=IsEqual(Lookup("step_1.traffic_input"), "Load Equivalent Factor"),
                              description="""
 Typical Values:
 - School Bus: 0.7
@@ -35,6 +99,12 @@ Typical Values:
 - Tractor-Trailer: 1.2
 """
                              )
+    step_1.spectrum = Table("Axle Load Spectrum (first year)",
+                            visible=IsEqual(Lookup("step_1.traffic_input"), "Axle Load Spectrum"),
+                            description="Axle group counts for both directions in the first year. LEFs use terminal serviceability 4.2 less the Allowable Change in Serviceability Factor below, at the SN they lead to.")
+    step_1.spectrum.weight = NumberField("Axle Group Weight (lb)")
+    step_1.spectrum.axles = OptionField("Axles", options=[1, 2, 3])
+    step_1.spectrum.count = NumberField("Annual Count")
     step_1.service_years = NumberField("Service Life of Roads (yrs)", default=20, )
     step_1.serviceability = NumberField("Allowable Change in Serviceability Factor", default=2.5, description="Index ranges from 1.0 (poor) to 5.0 (excellent). Allowable deterioration before repair is typically 2.0-4.0.")
     step_1.growth_rate = NumberField("Growth Rate (%)", default=2, )
@@ -84,38 +154,79 @@ Common Values:
     step_3.table.alkaline = OptionField("Alkaline", options=["Yes", "No"])
     step_3.excavation_cost = NumberField("Excavation Cost ($/cyd)", default=20.0)
     step_3.embankment_cost = NumberField("Embankment Cost ($/cyd)", default=10.0)
-    step_4 = Step("Step 4: Solve", views=["optimize", "optimize_graph", "optimize_html"])
+    step_4 = Step("Step 4: Solve", views=["optimize", "optimize_graph", "solver_diagnostics", "optimize_html"])
     step_4.goal_sn = NumberField("Required Structural Number", default=5.0,
                                  description="Use the value from Step 2 or provide an alternative.")
 
 
+def traffic(params, sn=5.0):
+    # (total trips or axle groups, design ESALs) from the Step 1 inputs, spectrum LEFs evaluated at sn
+    step_1 = params.step_1
+    if step_1.traffic_input == "Axle Load Spectrum":
+        rows = [r for r in step_1.spectrum if r.weight and r.axles and r.count]
+        if not rows:
+            return 0.0, 0.0
+        weights = sorted({r.weight for r in rows})
+        counts = [[0.0, 0.0, 0.0] for _ in weights]
+        for r in rows:
+            counts[weights.index(r.weight)][int(r.axles) - 1] += r.count
+        spectrum = loadspectrum.LoadSpectrum(weights, [1, 2, 3], counts).project(int(step_1.service_years),
+                                                                                 step_1.growth_rate / 100)
+        # the allowable change is taken from an initial serviceability of 4.2, as in aashto93
+        terminal_serviceability = 4.2 - step_1.serviceability
+        esals = loadspectrum.spectrum_esals(spectrum, terminal_serviceability, sn,
+                                            step_1.distribution / 100, step_1.lane_distribution / 100)
+        return spectrum.counts.sum(), esals.sum()
+    trips = aashto93.total_trips(step_1.adt, step_1.service_years, step_1.growth_rate / 100)
+    esals = aashto93.trips_to_esals(trips * step_1.trucks / 100, step_1.distribution / 100,
+                                    step_1.lane_distribution / 100, step_1.lef)
+    return trips, esals
+
+
+def design_sn(params, esals):
+    # required structural number for the Step 2 design criteria
+    step_2 = params.step_2
+    return aashto93.solve_sn(step_2.reliability / 100, step_2.standard_error / 100, step_2.serviceability_change,
+                             step_2.soil_resilient_modulus, esals)
+
+
+def design(params, tolerance=0.01, max_iter=20):
+    """
+    Traffic and required structural number: (total trips or axle groups, design ESALs, SN).
+
+    Spectrum LEFs depend on the SN they are designed for, so from an assumed SN of 5 the
+    ESALs and the SN are recomputed until the SN changes by less than tolerance.
+    """
+    sn = 5.0
+    for _ in range(max_iter):
+        trips, esals = traffic(params, sn)
+        required = design_sn(params, esals)
+        if params.step_1.traffic_input != "Axle Load Spectrum" or abs(required - sn) < tolerance:
+            break
+        sn = required
+    return trips, esals, required
+
+
 class Controller(ViktorController):
     label = 'My Entity Type'
     parametrization = Parametrization
 
     @DataView("Traffic Results", duration_guess=1)
     def show_traffic_results(self, params, **kwargs):
-        trips = aashto93.total_trips(params.step_1.adt, params.step_1.service_years, params.step_1.growth_rate / 100)
-        esals = aashto93.trips_to_esals(trips * params.step_1.trucks / 100, params.step_1.distribution / 100,
-                                        params.step_1.lane_distribution / 100, params.step_1.lef)
+        if params.step_1.traffic_input == "Axle Load Spectrum":
+            trips, esals, _sn = design(params)
+        else:
+            trips, esals = traffic(params)
+        label = "Total Axle Groups" if params.step_1.traffic_input == "Axle Load Spectrum" else "Total Trips"
         data = DataGroup(
-            DataItem("Total Trips", round(trips, -2)),
+            DataItem(label, round(trips, -2)),
             DataItem("ESAL", round(esals, -1)),
         )
         return DataResult(data)
 
     @DataView("Design Results", duration_guess=1)
     def show_design_results(self, params, **kwargs):
-        ## Values are stateless, so we recaulculate ##
-        trips = aashto93.total_trips(params.step_1.adt, params.step_1.service_years, params.step_1.growth_rate / 100)
-        esals = aashto93.trips_to_esals(trips * params.step_1.trucks / 100, params.step_1.distribution / 100,
-                                        params.step_1.lane_distribution / 100, params.step_1.lef)
-        ## end copy ##
-        z = params.step_2.reliability / 100
-        so = params.step_2.standard_error / 100
-        psi = params.step_2.serviceability_change
-        mr = params.step_2.soil_resilient_modulus
-        sn = aashto93.solve_sn(z, so, psi, mr, esals)
+        _trips, _esals, sn = design(params)
         data = DataGroup(
             DataItem("Structural Number", round(sn, 2)),
         )
@@ -129,7 +240,7 @@ class Controller(ViktorController):
         profile = params.step_1.typical_profile_height
         excavation = params.step_3.excavation_cost
         embankment = params.step_3.embankment_cost
-        top_3 = solvesection.solve(materials, goal_sn, profile, embankment, excavation)[:3]
+        top_3 = solve_sections(materials, goal_sn, profile, embankment, excavation)[:3]
         for section in top_3:
             section_data = []
             structural_number = round(solvesection.section_sn(section), 2)
@@ -150,31 +261,55 @@ class Controller(ViktorController):
 
     @PlotlyView("Optimization Graph", duration_guess=5)
     def optimize_graph(self, params, **kwargs):
-        # There is a lot of duplication here. TODO: More narrow functions in solvesection module
+        # plotly is only needed here, keep it out of worker start up
+        from plotly.subplots import make_subplots
+        import plotly.graph_objects as go
+
         materials = params.step_3.table
         goal_sn = params.step_4.goal_sn
         profile = params.step_1.typical_profile_height
         embankment = params.step_3.embankment_cost
         excavation = params.step_3.excavation_cost
-        # Get trial sections
-        material_list = solvesection.make_material_list(materials)
-        sample_population = 5000
-        trial_sections = [solvesection.make_trial_section(material_list) for _ in range(sample_population)]
-        trial_xs = [solvesection.section_sn(section) for section in trial_sections]
-        trial_ys = [solvesection.section_cost(section, profile, embankment, excavation) for section in trial_sections]
-        solved_sections = solvesection.solve(materials, goal_sn, profile, embankment, excavation)
+        frontier = [(sn, cost, section) for sn, cost, section in cost_frontier(materials, profile, embankment, excavation)
+                    if section is not None]
+        frontier_labels = ["<br>".join(f"{l.name}: {l.thickness:g} in" for l in section) for _, _, section in frontier]
+        solved_sections = solve_sections(materials, goal_sn, profile, embankment, excavation)
         solved_xs = [solvesection.section_sn(section) for section in solved_sections]
         solved_ys = [solvesection.section_cost(section, profile, embankment, excavation) for section in solved_sections]
-        fig = make_subplots(rows=2, cols=1, subplot_titles=(f"Initial Sections (n={sample_population})", f"Optimized Sections (n={len(solved_sections)})"))
-        fig.add_trace(go.Scatter(x=trial_xs, y=trial_ys, mode="markers", name="Initial Sections"), row=1, col=1)
-        fig.add_trace(go.Scatter(x=solved_xs, y=solved_ys, mode="markers", name="Optimized Sections"), row=2, col=1)
+        # bounded payload however many sections were evaluated
+        solved_traces = plotpayload.point_cloud_traces(
+            solved_xs, solved_ys, lambda i: "<br>".join(f"{l.name}: {l.thickness:g} in" for l in solved_sections[i]),
+            name="Optimized Sections", budget=GRAPH_POINT_BUDGET)
+        fig = make_subplots(rows=2, cols=1, subplot_titles=("Lowest Cost by Required Structural Number", f"Optimized Sections (n={len(solved_sections)})"))
+        fig.add_trace(go.Scattergl(x=[sn for sn, _, _ in frontier], y=[cost for _, cost, _ in frontier], mode="lines+markers",
+                                   text=frontier_labels, name="Lowest Cost Section"), row=1, col=1)
+        fig.add_vline(x=goal_sn, line_dash="dash", row=1, col=1)
+        for trace in solved_traces:
+            fig.add_trace(trace, row=2, col=1)
         fig.update_yaxes(title_text="Cost ($/sy)", row=2, col=1)
         fig.update_yaxes(title_text="Cost ($/sy)", row=1, col=1)
-        fig.update_xaxes(title_text="Structural Number", row=1, col=1)
+        fig.update_xaxes(title_text="Required Structural Number", row=1, col=1)
         fig.update_xaxes(title_text="Structural Number", row=2, col=1)
         fig.update_layout(title="Optimization Graph")
         return PlotlyResult(fig.to_json())
 
+    @DataView("Solver Diagnostics", duration_guess=5)
+    def solver_diagnostics(self, params, **kwargs):
+        materials = params.step_3.table
+        goal_sn = params.step_4.goal_sn
+        profile = params.step_1.typical_profile_height
+        embankment = params.step_3.embankment_cost
+        excavation = params.step_3.excavation_cost
+        diagnostics = solve_diagnostics(materials, goal_sn, profile, embankment, excavation)
+        stages = [DataItem(name, round(seconds * 1000, 2), suffix="ms") for name, seconds in diagnostics["stages"].items()]
+        counts = [DataItem(name.replace("_", " ").capitalize(), value) for name, value in diagnostics["counts"].items()]
+        cache = [DataItem(name.replace("_", " ").capitalize(), round(value, 3)) for name, value in solve_cache.stats().items()]
+        return DataResult(DataGroup(
+            DataItem("Solve Time", round(diagnostics["total_seconds"] * 1000, 2), suffix="ms", subgroup=DataGroup(*stages)),
+            DataItem("Candidates", "", subgroup=DataGroup(*counts)),
+            DataItem("Result Cache", "", subgroup=DataGroup(*cache)),
+        ))
+
     # Explainers
     @WebView("Design Explanation", duration_guess=1)
     def design_html(self, params, **kwargs):
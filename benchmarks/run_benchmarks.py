@@ -0,0 +1,281 @@
+"""
+Benchmarks for the ESAL, SN and section optimizer hot paths.
+
+    python benchmarks/run_benchmarks.py -o bench.json
+    python benchmarks/run_benchmarks.py -o bench.json --baseline previous.json
+
+Every benchmark records its best and median wall time over several repeats. Section solves
+also record solution quality against an exhaustive reference, which tries every lift grid
+thickness up to REFERENCE_CAP for every stack, independently of the thickness grids and
+the stack enumeration and the closed form step of fit_stack. With --baseline, a benchmark
+more than --tolerance and --floor seconds slower than the baseline, or with a worse
+optimality gap, is reported and the exit status is 1.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from itertools import combinations, permutations
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import aashto93  # noqa: E402
+import app  # noqa: E402
+import catalog  # noqa: E402
+import reliability  # noqa: E402
+import traffic  # noqa: E402
+import solvesection  # noqa: E402
+
+DEFAULT_TABLE = app.Parametrization._material_table_defaults
+# thickest lift grid thickness (in) the exhaustive reference tries
+REFERENCE_CAP = 60.0
+# fast benchmarks repeat until they add up to MIN_SECONDS; compare ignores slowdowns under COMPARE_FLOOR seconds
+MIN_SECONDS = 0.5
+COMPARE_FLOOR = 0.01
+
+
+def synthetic_catalog(count, seed=0):
+    """
+    Material table with count random but plausible materials, about a fifth of them surface courses.
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(count):
+        surface = i % 5 == 0
+        subgrade = not surface and i % 7 == 3
+        minimum = float(rng.choice([1.5, 2.0, 3.0, 4.0, 6.0]))
+        unit = str(rng.choice(["ton", "cyd"]))
+        rows.append({
+            "mat_name": f"Material {i}",
+            "sn": round(float(rng.uniform(0.3, 0.48) if surface else rng.uniform(0.08, 0.3)), 3),
+            "min": minimum,
+            "max": minimum * float(rng.choice([2.0, 3.0, 4.0])),
+            "density": round(float(rng.uniform(110, 150)), 1),
+            "cost": round(float(rng.uniform(90, 160) if surface else rng.uniform(20, 400 if unit == "cyd" else 80)), 2),
+            "unit": unit,
+            "surface": "Yes" if surface else "No",
+            "subgrade": "Yes" if subgrade else "No",
+            "alkaline": "Yes" if not surface and rng.random() < 0.25 else "No",
+        })
+    return rows
+
+
+def regional_catalog(materials, suppliers, seed=0):
+    """
+    synthetic_catalog(materials) offered by several suppliers at prices up to 30% apart.
+    """
+    rng = np.random.default_rng(seed)
+    base = synthetic_catalog(materials, seed)
+    return [dict(row, mat_name=f"{row['mat_name']} supplier {s}", cost=round(row["cost"] * float(rng.uniform(0.9, 1.2)), 2))
+            for s in range(suppliers) for row in base]
+
+
+def measure(function, repeat=5, min_seconds=MIN_SECONDS):
+    # at least repeat runs, more for fast functions until they add up to min_seconds
+    times = []
+    while len(times) < repeat or (sum(times) < min_seconds and len(times) < 1000):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return {"best_seconds": min(times), "median_seconds": float(np.median(times)), "repeat": len(times)}
+
+
+def lift_grid(layer, cap=REFERENCE_CAP):
+    # every constructible thickness of a layer up to cap, independent of solvesection.thickness_grid
+    if layer.min_lift == layer.max_lift:
+        grid = np.array([layer.min_lift])
+    else:
+        grid = np.arange(layer.min_lift, cap + 1e-9, solvesection.lift_increment(layer))
+    return grid[solvesection.valid_lift(grid, layer.min_lift, layer.max_lift)]
+
+
+def reference_stacks(material_list, max_layers=4):
+    # one valid ordering of every set of materials, independent of solvesection.enumerate_stacks
+    for n in range(1, max_layers + 1):
+        for materials in combinations(material_list, n):
+            for stack in permutations(materials):
+                if solvesection.validate_stack(stack):
+                    yield stack
+                    break
+
+
+def exhaustive_reference(material_table, goal_sn, grade, embankment_cost, excavation_cost, max_layers=4):
+    """
+    Cheapest cost of every stack over every lift grid thickness up to REFERENCE_CAP.
+
+    Layers are added one at a time to all partial combinations. Of those with the same total
+    thickness (and so the same earthwork), only the ones no other beats on SN (counted up to
+    the goal) and cost are kept, which leaves the minimum unchanged.
+    """
+    costs = []
+    for stack in reference_stacks(solvesection.make_material_list(material_table), max_layers):
+        thickness, sn, cost = np.zeros(1), np.zeros(1), np.zeros(1)
+        grids = [lift_grid(layer) for layer in stack]
+        if any(len(g) == 0 for g in grids):
+            continue
+        for layer, grid in zip(stack, grids):
+            thickness = (thickness[:, None] + grid).ravel()
+            sn = np.minimum(sn[:, None] + layer.sn * grid, goal_sn).ravel()
+            cost = (cost[:, None] + layer.cost_per_inch * grid).ravel()
+            order = np.lexsort((cost, -sn, np.round(thickness, 6)))
+            thickness, sn, cost = thickness[order], sn[order], cost[order]
+            group = np.cumsum(np.concatenate([[0], np.diff(np.round(thickness, 6)) != 0]))
+            # running minimum of the cost that restarts at every thickness
+            shifted = cost - 2 * (np.ptp(cost) + 1.0) * group
+            kept = shifted < np.concatenate([[np.inf], np.minimum.accumulate(shifted)[:-1]])
+            thickness, sn, cost = thickness[kept], sn[kept], cost[kept]
+        reaches = sn >= goal_sn - 1e-9
+        if not reaches.any():
+            continue
+        fill = grade - thickness[reaches]
+        earthwork = np.where(fill > 0, embankment_cost, excavation_cost) / 36 * fill
+        costs.append(float((cost[reaches] + earthwork).min()))
+    return sorted(costs)
+
+
+def optimality(material_table, goal_sn, grade, embankment_cost, excavation_cost, max_layers, top_n=3):
+    sections = solvesection.solve(material_table, goal_sn, grade, embankment_cost, excavation_cost, top_n, max_layers)
+    costs = [solvesection.section_cost(s, grade, embankment_cost, excavation_cost) for s in sections]
+    reference = exhaustive_reference(material_table, goal_sn, grade, embankment_cost, excavation_cost, max_layers)[:top_n]
+    gaps = [(c - r) / r for c, r in zip(costs, reference)]
+    return {"optimality_gap": max(gaps) if gaps else 0.0, "top_costs": costs, "reference_costs": reference}
+
+
+def run_benchmarks(quick=False):
+    repeat = 2 if quick else 5
+    scale = 10 if quick else 1
+    rng = np.random.default_rng(0)
+    results = {}
+
+    n = 1000 // scale
+    args = [rng.uniform(0.5, 0.99, n), rng.uniform(0.35, 0.5, n), rng.uniform(1.5, 3.0, n),
+            rng.uniform(3000, 30000, n), 10**rng.uniform(4, 7, n)]
+    result = measure(lambda: [aashto93.solve_sn(*v) for v in zip(*args)], repeat)
+    results["solve_sn_scalar"] = dict(result, calls=n, per_second=n / result["best_seconds"])
+
+    n = 1_000_000 // scale
+    args = [rng.uniform(0.5, 0.99, n), rng.uniform(0.35, 0.5, n), rng.uniform(1.5, 3.0, n),
+            rng.uniform(3000, 30000, n), 10**rng.uniform(4, 7, n)]
+    result = measure(lambda: aashto93.solve_sn(*args), repeat)
+    results["solve_sn_batch"] = dict(result, calls=n, per_second=n / result["best_seconds"])
+
+    n = 10_000 // scale
+    result = measure(lambda: [aashto93.total_trips(1000.0, 100, 0.02) for _ in range(n)], repeat)
+    results["total_trips_100_years"] = dict(result, calls=n, per_second=n / result["best_seconds"])
+
+    n = 20_000 // scale
+    segments = (rng.uniform(100, 20000, n), rng.integers(10, 41, n),
+                np.stack([rng.uniform(0, 0.05, n), rng.uniform(0, 0.03, n)], axis=1))
+    splits = (rng.uniform(0.02, 0.1, n), 0.5, rng.uniform(0.6, 1.0, n), 1.2)
+    result = measure(lambda: traffic.annual_esals(*segments, *splits, starts=[0, 10]), repeat)
+    results["traffic_annual_esals_segments"] = dict(result, calls=n, per_second=n / result["best_seconds"])
+    result = measure(lambda: traffic.design_esals(*segments, *splits, starts=[0, 10]), repeat)
+    results["traffic_design_esals_segments"] = dict(result, calls=n, per_second=n / result["best_seconds"])
+
+    n = 10_000 // scale
+    result = measure(lambda: [aashto93.flexible_equivalent_single_axle_load(30000, 2, 2.5, 5.0) for _ in range(n)], repeat)
+    results["flexible_esal_scalar"] = dict(result, calls=n, per_second=n / result["best_seconds"])
+
+    n = 1_000_000 // scale
+    weight = rng.uniform(2000, 60000, n)
+    axles = rng.integers(1, 4, n)
+    result = measure(lambda: aashto93.flexible_equivalent_single_axle_load(weight, axles, 2.5, 5.0), repeat)
+    results["flexible_esal_batch"] = dict(result, calls=n, per_second=n / result["best_seconds"])
+
+    sections = solvesection.solve(DEFAULT_TABLE, 4.5, top_n=10)
+    n = 1_000_000 // scale
+    result = measure(lambda: reliability.failure_probability(
+        sections, 2000.0, 20, 0.02, 0.05, 0.5, 1.0, 1.0, 2.5, 3000.0, 0.45, max_samples=n, tolerance=0.0,
+        relative_tolerance=0.0, rng=0), 1 if not quick else repeat)
+    results["reliability_monte_carlo"] = dict(result, samples=n, sections=len(sections))
+
+    problem = (5.0, 6.0, 10.0, 20.0)
+    catalogs = [("default", DEFAULT_TABLE, 4, True)]
+    catalogs += [(f"synthetic_{count}", synthetic_catalog(count), layers, count <= 20)
+                 for count, layers in ((20, 4), (50, 3), (100, 3))]
+    if quick:
+        catalogs = catalogs[:2]
+    for name, table, max_layers, check in catalogs:
+        result = measure(lambda: solvesection.solve(table, *problem, top_n=3, max_layers=max_layers),
+                         repeat if len(table) <= 20 else 1)
+        result.update(materials=len(table), max_layers=max_layers)
+        if check:
+            result.update(optimality(table, *problem, max_layers=max_layers))
+        results[f"solve_{name}"] = result
+    # layers cheaper than the embankment they displace are best laid up to the grade
+    high_fill = (3.0, 40.0, 150.0, 20.0)
+    result = measure(lambda: solvesection.solve(DEFAULT_TABLE, *high_fill, top_n=3, max_layers=4), repeat)
+    result.update(materials=len(DEFAULT_TABLE), max_layers=4)
+    result.update(optimality(DEFAULT_TABLE, *high_fill, max_layers=4))
+    results["solve_default_high_embankment"] = result
+    if not quick:
+        table = regional_catalog(30, 10)
+        result = measure(lambda: catalog.CatalogIndex.build(table), repeat)
+        index = catalog.CatalogIndex.build(table)
+        result.update(materials=len(table), kept=len(index))
+        results["catalog_index_build_regional_300"] = result
+        result = measure(lambda: index.solve(*problem, top_n=3, max_layers=4), 1)
+        result.update(materials=len(table), kept=len(index), max_layers=4)
+        results["solve_regional_300_index"] = result
+    return results
+
+
+def compare(results, baseline, tolerance=0.25, floor=COMPARE_FLOOR):
+    """
+    Regressions of results against a baseline run.
+
+    A benchmark is slower when it takes more than tolerance times and floor seconds longer
+    than in the baseline; the floor keeps timer noise of millisecond cases out.
+
+    Returns:
+    list: messages, empty if there are none
+    """
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        ratio = result["best_seconds"] / before["best_seconds"]
+        if ratio > 1 + tolerance and result["best_seconds"] - before["best_seconds"] > floor:
+            regressions.append(f"{name}: {ratio:.2f}x slower ({before['best_seconds']:.4g}s -> {result['best_seconds']:.4g}s)")
+        if "optimality_gap" in result and "optimality_gap" in before and \
+                result["optimality_gap"] > before["optimality_gap"] + 1e-9:
+            regressions.append(f"{name}: optimality gap {before['optimality_gap']:.3g} -> {result['optimality_gap']:.3g}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-o", "--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown against the baseline")
+    parser.add_argument("--floor", type=float, default=COMPARE_FLOOR,
+                        help="slowdowns of fewer seconds are never reported")
+    parser.add_argument("--quick", action="store_true", help="smaller problems and fewer repeats")
+    args = parser.parse_args(argv)
+    results = run_benchmarks(args.quick)
+    report = {
+        "meta": {"python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+                 "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "quick": args.quick},
+        "results": results,
+    }
+    for name, result in results.items():
+        extra = f"  gap {result['optimality_gap']:.2e}" if "optimality_gap" in result else ""
+        print(f"{name:28s} {result['best_seconds'] * 1000:10.2f} ms{extra}")
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text())["results"], args.tolerance,
+                              args.floor)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
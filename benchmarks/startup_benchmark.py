@@ -0,0 +1,91 @@
+"""
+Worker cold start benchmark: import time of the app and core modules.
+
+    python benchmarks/startup_benchmark.py -o startup.json
+
+Every module is imported in a fresh interpreter (best of --repeat runs), and the heavy
+packages it pulled in are recorded. A module over its time budget, or loading a heavy
+package it must not, is reported and the exit status is 1. The viktor SDK itself loads
+SciPy, so the app is only held to keeping plotly and pandas out.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY = ("scipy.optimize", "plotly", "pandas")
+# module: (seconds, heavy packages it may load)
+BUDGETS = {
+    "aashto93": (0.5, ()),
+    "sntable": (0.5, ()),
+    "solvesection": (0.5, ()),
+    "traffic": (0.5, ()),
+    "loadspectrum": (0.5, ()),
+    "app": (2.5, ("scipy.optimize",)),
+}
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(module, repeat=3):
+    """
+    Best import time of a module in a fresh interpreter and the heavy packages it loaded.
+    """
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY)], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output.splitlines()[-1]))
+    best = min(runs, key=lambda r: r["seconds"])
+    return {"best_seconds": best["seconds"], "repeat": repeat, "heavy_modules": best["loaded"]}
+
+
+def check(results, budgets=BUDGETS, scale=1.0):
+    """
+    Budget violations of import results.
+
+    Returns:
+    list: messages, empty if there are none
+    """
+    violations = []
+    for module, result in results.items():
+        seconds, allowed = budgets[module]
+        if result["best_seconds"] > seconds * scale:
+            violations.append(f"{module}: import took {result['best_seconds']:.3f}s, budget {seconds * scale:.3f}s")
+        extra = [m for m in result["heavy_modules"] if m not in allowed]
+        if extra:
+            violations.append(f"{module}: loads {', '.join(extra)} at import")
+    return violations
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-o", "--output", help="write results as JSON")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="multiply every time budget, for slow machines")
+    args = parser.parse_args(argv)
+    results = {module: measure_import(module, args.repeat) for module in BUDGETS}
+    for module, result in results.items():
+        heavy = f"  loads {', '.join(result['heavy_modules'])}" if result["heavy_modules"] else ""
+        print(f"import {module:20s} {result['best_seconds'] * 1000:10.1f} ms{heavy}")
+    if args.output:
+        report = {"meta": {"python": platform.python_version(), "machine": platform.machine(),
+                           "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}, "results": results}
+        Path(args.output).write_text(json.dumps(report, indent=2))
+    violations = check(results, scale=args.budget_scale)
+    for message in violations:
+        print(f"OVER BUDGET {message}")
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,372 @@
+"""
+Compiled material catalog index.
+
+Regional catalogs list hundreds of supplier variants of a handful of materials. A
+CatalogIndex parses a material table once and keeps what the section search needs:
+
+- which pairs of materials may share a stack (validate_stack),
+- the materials left after dropping dominated supplier variants.
+
+Valid stacks are generated directly from the role codes of the materials (surface,
+subgrade treatment, alkaline), and CatalogIndex.solve fits them cheapest lower bound
+first, stopping once no remaining stack can enter the top N.
+The index is saved as JSON, so a deployment compiles its catalogs once:
+
+    python catalog.py catalogs/region.json -o catalogs/region.index.json
+"""
+import argparse
+import heapq
+import json
+import sys
+from itertools import combinations, combinations_with_replacement
+from pathlib import Path
+
+import numpy as np
+
+import solvesection
+from solveprofile import NULL_PROFILE
+
+FORMAT_VERSION = 1
+
+
+def dominance_matrix(arrays):
+    """
+    dominates[i, j] is True when material i can replace material j in any section at no extra cost.
+
+    i has the same role codes and lift limits as j (so the same thicknesses are valid and
+    the same stacks can be built), at least the SN per inch and at most the cost per inch,
+    and is strictly better in one of them.
+    """
+    n = len(arrays)
+    column = lambda values: values[:n]
+    same = np.ones((n, n), dtype=bool)
+    for values in (arrays.surface_code, arrays.subgrade_code, arrays.alkaline_code, arrays.min_lift, arrays.max_lift):
+        same &= column(values)[:, None] == column(values)[None, :]
+    sn = column(arrays.sn)
+    cost = column(arrays.cost_per_inch)
+    no_worse = (sn[:, None] >= sn[None, :]) & (cost[:, None] <= cost[None, :])
+    better = (sn[:, None] > sn[None, :]) | (cost[:, None] < cost[None, :])
+    other_name = column(arrays.name_code)[:, None] != column(arrays.name_code)[None, :]
+    return same & no_worse & better & other_name
+
+
+def prune_dominated(dominates, depth):
+    """
+    Materials to keep: a material is dropped once depth kept materials dominate it.
+
+    With depth = top_n + max_layers - 1, a section using a dropped material still has at
+    least top_n distinct replacements, none more expensive, that do not.
+
+    Returns:
+    ndarray: sorted indices of the kept materials
+    """
+    kept = np.zeros(len(dominates), dtype=bool)
+    # dominance is transitive, so every dominator has fewer dominators than what it dominates
+    for j in np.argsort(dominates.sum(axis=0), kind="stable"):
+        kept[j] = (dominates[:, j] & kept).sum() < depth
+    return np.flatnonzero(kept)
+
+
+def role_patterns(n):
+    """
+    Role code counts of every set of n materials that can be stacked.
+
+    A set can be ordered into a valid stack when it has a surface course, at most one
+    subgrade treatment and few enough alkaline materials to keep them apart (validate_stack
+    also treats the first and last layers as neighbours).
+
+    Returns:
+    list: tuples of (surface, subgrade, alkaline) codes, one per material of the set
+    """
+    codes = [(s, g, a) for s in (0, 1) for g in (0, 1) for a in (0, 1)]
+    patterns = []
+    for pattern in combinations_with_replacement(codes, n):
+        surface = sum(c[0] for c in pattern)
+        subgrade = sum(c[1] for c in pattern)
+        alkaline = sum(c[2] for c in pattern)
+        if surface >= 1 and subgrade <= 1 and alkaline <= (n // 2 if n > 1 else 0):
+            patterns.append(pattern)
+    return patterns
+
+
+def earthwork_lines(grade, embankment_cost, excavation_cost, count=5):
+    """
+    Lines (rate, offset) with offset - rate * T <= earthwork_cost(T) for every total thickness T >= 0.
+
+    When embankment costs at least as much as excavation, earthwork is convex in T and any
+    rate between the two gives such a line through the grade.
+    """
+    fill = embankment_cost / 36
+    cut = excavation_cost / 36
+    if grade <= 0:
+        return [(cut, cut * grade)]
+    if fill >= cut:
+        return [(rate, rate * grade) for rate in np.linspace(cut, fill, count)]
+    return [(cut, fill * grade)]
+
+
+class CatalogIndex():
+    def __init__(self, material_table, kept=None, depth=None):
+        """
+        Parameters:
+        material_table (list): rows of the material table
+        kept (array_like): indices of the materials to search, all of them by default
+        depth (int): dominance depth the kept materials were pruned with, None if unpruned
+        """
+        self.material_table = [dict(row) for row in material_table]
+        self.material_list = solvesection.make_material_list(self.material_table)
+        self.arrays = solvesection.MaterialArrays(self.material_list)
+        self.kept = np.arange(len(self.material_list)) if kept is None else np.asarray(kept, dtype=int)
+        self.depth = depth
+        names = self.arrays.name_code[:-1]
+        subgrade = self.arrays.subgrade_code[:-1].astype(bool)
+        # may share a stack
+        self.compatible = (names[:, None] != names[None, :]) & ~(subgrade[:, None] & subgrade[None, :])
+        return None
+
+    def __len__(self):
+        return len(self.kept)
+
+    @classmethod
+    def build(cls, material_table, top_n=3, max_layers=4, prune=True):
+        """
+        Compile a material table, dropping materials that cannot change its top_n sections.
+        """
+        index = cls(material_table)
+        if not prune:
+            return index
+        depth = top_n + max_layers - 1
+        return cls(index.material_table, prune_dominated(dominance_matrix(index.arrays), depth), depth)
+
+    def supports(self, top_n, max_layers):
+        # whether pruning kept enough materials for an exact top_n of max_layers sections
+        return self.depth is None or (top_n is not None and top_n + max_layers - 1 <= self.depth)
+
+    def save(self, path):
+        data = {
+            "version": FORMAT_VERSION,
+            "material_table": self.material_table,
+            "kept": self.kept.tolist(),
+            "depth": self.depth,
+        }
+        Path(path).write_text(json.dumps(data))
+
+    @classmethod
+    def load(cls, path):
+        data = json.loads(Path(path).read_text())
+        if data.get("version") != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported catalog index version {data.get('version')!r}")
+        return cls(data["material_table"], data["kept"], data["depth"])
+
+    def stack_sets(self, n, materials=None):
+        """
+        Every set of n materials (kept materials by default) that can be ordered into a valid stack.
+
+        Returns:
+        ndarray: material indices, one ascending row per set
+        """
+        blocks = [sets for sets, _ in self._stack_blocks(n, self.kept if materials is None else materials)]
+        return np.concatenate(blocks) if blocks else np.empty((0, n), dtype=int)
+
+    def _stack_blocks(self, n, materials, problem=None, limit=np.inf):
+        """
+        stack_sets one role pattern at a time, with the lower bound of every set if a problem is given.
+
+        A set is the product of one combination per role pattern, and the bound only needs
+        sums and minima over its layers, so it is evaluated over the product of the
+        combination terms and only sets with a bound of at most limit are built.
+
+        Yields:
+        tuple: (sets, lower bounds or None)
+        """
+        groups = {}
+        for i in materials:
+            layer = self.material_list[i]
+            groups.setdefault((layer.surface_code, layer.subgrade_code, layer.alkaline_code), []).append(int(i))
+        for pattern in role_patterns(n):
+            counts = {code: pattern.count(code) for code in set(pattern)}
+            if any(len(groups.get(code, ())) < c for code, c in counts.items()):
+                continue
+            parts = [np.array(list(combinations(groups[code], c)), dtype=int) for code, c in counts.items()]
+            shape = tuple(len(p) for p in parts)
+            bound = None
+            if problem is None:
+                rows = np.arange(np.prod(shape))
+            else:
+                grid = lambda k, values: values.reshape([-1 if j == k else 1 for j in range(len(parts))])
+                bound = -np.inf
+                for rate, offset in earthwork_lines(*problem[1:]):
+                    total = [0.0, 0.0, np.inf]
+                    for k, part in enumerate(parts):
+                        cost, sn, per_sn = self._bound_terms(part, *problem[:3], rate)
+                        total = [total[0] + grid(k, cost), total[1] + grid(k, sn), np.minimum(total[2], grid(k, per_sn))]
+                    bound = np.maximum(bound, self._bound(*total, problem[0], offset))
+                bound = np.broadcast_to(bound, shape).ravel()
+                rows = np.flatnonzero(bound <= limit)
+                bound = bound[rows]
+            picks = np.unravel_index(rows, shape)
+            sets = np.sort(np.concatenate([p[pick] for p, pick in zip(parts, picks)], axis=1), axis=1)
+            # drop sets with two materials of the same name
+            pairs = np.ones(len(sets), dtype=bool)
+            for a, b in combinations(range(n), 2):
+                pairs &= self.compatible[sets[:, a], sets[:, b]]
+            yield sets[pairs], None if bound is None else bound[pairs]
+
+    def seed_materials(self, count):
+        # the count lowest cost per SN kept materials of every role pattern
+        groups = {}
+        for i in self.kept:
+            layer = self.material_list[i]
+            groups.setdefault((layer.surface_code, layer.subgrade_code, layer.alkaline_code), []).append(int(i))
+        seed = [i for group in groups.values() for i in sorted(group, key=lambda i: self.arrays.cost_per_sn[i])[:count]]
+        return np.sort(seed)
+
+    def lower_bounds(self, sets, goal_sn, grade=0.0, embankment_cost=0.0, excavation_cost=0.0):
+        """
+        Lower bound of the fitted cost of every set, from the continuous relaxation of fit_stack.
+
+        Earthwork is bounded below by lines in the total thickness (earthwork_lines), so each
+        layer costs at least its cost per inch less the slope of the line. Layers cheaper
+        than that are laid at the top of their thickness grid, the others at their minimum
+        lift, and the SN still missing is bought at the lowest cost per SN of a layer that can
+        be thickened. The bound is the best over the lines.
+
+        Parameters:
+        sets (ndarray): padded index matrix of material sets
+        """
+        bounds = [self._bound(*self._bound_terms(sets, goal_sn, grade, embankment_cost, rate), goal_sn, offset)
+                  for rate, offset in earthwork_lines(grade, embankment_cost, excavation_cost)]
+        return np.max(bounds, axis=0)
+
+    def _bound_terms(self, sets, goal_sn, grade, embankment_cost, rate):
+        # per set: cost and SN of the relaxed thicknesses, lowest cost of any SN added on top
+        arrays = self.arrays
+        real = sets >= 0
+        sn = arrays.sn[sets]
+        min_lift = arrays.min_lift[sets]
+        max_lift = arrays.max_lift[sets]
+        per_inch = arrays.cost_per_inch[sets] - rate
+        adjustable = real & (min_lift != max_lift)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # no thickness_grid goes past this
+            needed = np.maximum(goal_sn / sn, np.where(arrays.cost_per_inch[sets] < embankment_cost / 36, grade, 0.0))
+            top = np.where(adjustable, np.maximum(min_lift, needed) + arrays.increment[sets] + max_lift, min_lift)
+            thickness = np.where(real, np.where(per_inch < 0, top, min_lift), 0.0)
+            per_sn = np.where(adjustable & (per_inch >= 0), per_inch / sn, np.inf).min(axis=1)
+        return (per_inch * thickness).sum(axis=1), (sn * thickness).sum(axis=1), per_sn
+
+    @staticmethod
+    def _bound(cost, sn, per_sn, goal_sn, offset):
+        short = np.maximum(goal_sn - sn, 0.0)
+        with np.errstate(invalid="ignore"):
+            extra = np.where(short > 0, short * per_sn, 0.0)
+        bound = offset + cost + extra
+        # the bound of a stack can equal its fitted cost; keep it below after rounding
+        return bound - 1e-9 * (1.0 + np.abs(bound))
+
+    def solve(self, goal_sn, grade=0.0, embankment_cost=0.0, excavation_cost=0.0, top_n=3, max_layers=4,
+              chunk_size=64, profile=NULL_PROFILE):
+        """
+        solvesection.solve over the index.
+
+        A first search over the cheapest materials per SN of every role gives an upper bound
+        on the top_n-th cost, and only stacks with a lower bound below it are kept. These are
+        fitted in order of their lower bound until the bound of the next one exceeds the cost
+        of the top_n-th section found. Ties are broken as in solvesection.solve, so an
+        unpruned index returns the same sections.
+
+        Returns:
+        list: Sections ordered by cost
+        """
+        if not self.supports(top_n, max_layers):
+            raise ValueError(f"index was pruned for top_n + max_layers <= {self.depth + 1}")
+        problem = (goal_sn, grade, embankment_cost, excavation_cost)
+        limit = np.inf
+        if top_n is not None:
+            seed = self.seed_materials(top_n + max_layers - 1)
+            if len(seed) < len(self.kept):
+                with profile.stage("seed"):
+                    best = self._search(*self._candidates(seed, max_layers, problem, limit), problem, top_n,
+                                        max_layers, chunk_size, NULL_PROFILE)
+                if len(best) == top_n:
+                    limit = -best[0][0]
+        with profile.stage("enumerate"):
+            candidates = self._candidates(self.kept, max_layers, problem, limit, profile)
+        best = self._search(*candidates, problem, top_n, max_layers, chunk_size, profile)
+        best = sorted(best, key=lambda e: e[:3], reverse=True)
+        sections = [solvesection.make_section(entry[3], entry[4]) for entry in best]
+        profile.count("sections_returned", len(sections))
+        return sections
+
+    def _candidates(self, materials, max_layers, problem, limit, profile=NULL_PROFILE):
+        """
+        Stacks of the given materials with a lower bound of at most limit.
+
+        Returns:
+        tuple: (padded index matrix, stack sizes, lower bounds)
+        """
+        padded, size, bounds = [], [], []
+        for n in range(1, max_layers + 1):
+            for sets, bound in self._stack_blocks(n, materials, problem, limit):
+                profile.count("stacks_bounded", len(sets))
+                padded.append(np.pad(sets, ((0, 0), (0, max_layers - n)), constant_values=-1))
+                size.append(np.full(len(sets), n))
+                bounds.append(bound)
+        if not padded:
+            return np.empty((0, max_layers), dtype=int), np.empty(0, dtype=int), np.empty(0)
+        return np.concatenate(padded), np.concatenate(size), np.concatenate(bounds)
+
+    def _search(self, padded, size, bounds, problem, top_n, max_layers, chunk_size, profile):
+        """
+        Fit stacks cheapest lower bound first.
+
+        Returns:
+        list: heap of (-cost, -size, negated material indices, stack, thicknesses) of the top_n stacks
+        """
+        # ties in enumeration order: by size, then material indices
+        order = np.lexsort(padded.T[::-1].tolist() + [size, bounds])
+        best = []
+        full = lambda: top_n is not None and len(best) == top_n
+        with profile.stage("fit"):
+            for start in range(0, len(order), chunk_size):
+                chunk = order[start:start + chunk_size]
+                if full() and bounds[chunk[0]] > -best[0][0]:
+                    break
+                for n in np.unique(size[chunk]):
+                    rows = chunk[size[chunk] == n]
+                    ordered, found = solvesection.order_stack_sets(self.arrays, padded[rows, :n], max_layers)
+                    for row, stack_row in zip(rows[found], ordered[found]):
+                        if full() and bounds[row] > -best[0][0]:
+                            continue
+                        stack = [self.material_list[i] for i in stack_row if i >= 0]
+                        fitted = solvesection.fit_stack(stack, *problem, profile=profile)
+                        profile.count("stacks_fitted")
+                        if fitted is None:
+                            profile.count("stacks_infeasible")
+                            continue
+                        key = (-float(fitted[0]), -int(n), tuple(-padded[row, :n]))
+                        if not full():
+                            heapq.heappush(best, key + (stack, fitted[1]))
+                        elif key > best[0][:3]:
+                            heapq.heapreplace(best, key + (stack, fitted[1]))
+        return best
+
+
+def main(argv=None):
+    import corridor
+
+    parser = argparse.ArgumentParser(description="Compile a material catalog into a search index.")
+    parser.add_argument("catalog", help="material table (.json or .csv)")
+    parser.add_argument("-o", "--output", required=True, help="index file (.index.json)")
+    parser.add_argument("--top-n", type=int, default=3, help="largest number of sections the index must support")
+    parser.add_argument("--max-layers", type=int, default=4)
+    parser.add_argument("--no-prune", action="store_true", help="keep dominated materials")
+    args = parser.parse_args(argv)
+    index = CatalogIndex.build(corridor.load_catalog(args.catalog), args.top_n, args.max_layers, not args.no_prune)
+    index.save(args.output)
+    print(f"kept {len(index)} of {len(index.material_list)} materials", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
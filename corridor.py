@@ -0,0 +1,271 @@
+"""
+Headless corridor design.
+
+Reads street segments from a CSV or Parquet file, runs the same chain as the app
+(total_trips -> trips_to_esals -> solve_sn -> solvesection.solve) for each of them and
+streams the cheapest sections to a JSON Lines or CSV file. Segments are read and written
+in chunks, so memory does not grow with the input, and a checkpoint file lets an
+interrupted run resume where it stopped.
+
+Segment columns use the names of the app fields; only adt and catalog are required:
+
+    segment, adt, distribution, lane_distribution, trucks, lef, service_years, growth_rate,
+    typical_profile_height, reliability, standard_error, serviceability_change,
+    soil_resilient_modulus, excavation_cost, embankment_cost, goal_sn, catalog
+
+catalog names a material table in the catalog directory: a compiled index
+(<name>.index.json, see catalog.py), <name>.json with a list of rows, or <name>.csv with
+the material table columns. goal_sn overrides the SN from the design criteria. A segment
+whose SN does not converge (e.g. no traffic) is written with converged false and, unless
+it gives goal_sn, no sections.
+
+    python corridor.py segments.csv --catalog-dir catalogs -o designs.jsonl --checkpoint designs.ckpt
+
+Parquet segments need pyarrow, which the app does not; requirements-corridor.txt adds it.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+
+import aashto93
+import parallelsolve
+import solvesection
+import traffic
+from catalog import CatalogIndex
+
+DEFAULTS = {
+    "distribution": 50.0,
+    "lane_distribution": 100.0,
+    "trucks": 5.0,
+    "lef": 1.0,
+    "service_years": 20,
+    "growth_rate": 2.0,
+    "typical_profile_height": 0.0,
+    "reliability": 95.0,
+    "standard_error": 45.0,
+    "serviceability_change": 2.5,
+    "soil_resilient_modulus": 3000.0,
+    "excavation_cost": 20.0,
+    "embankment_cost": 10.0,
+}
+MATERIAL_NUMBERS = ("sn", "min", "max", "density", "cost")
+
+
+def read_segments(path, batch_size=1024):
+    """
+    Yield segment records (dicts) from a CSV or Parquet file without loading it whole.
+    """
+    path = Path(path)
+    if path.suffix.lower() in (".parquet", ".pq"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("reading Parquet segments requires pyarrow") from None
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            yield from batch.to_pylist()
+    else:
+        with open(path, newline="") as f:
+            yield from csv.DictReader(f)
+
+
+def load_catalog(path):
+    path = Path(path)
+    if path.suffix.lower() == ".json":
+        rows = json.loads(path.read_text())
+    else:
+        with open(path, newline="") as f:
+            rows = list(csv.DictReader(f))
+    return [{k: float(v) if k in MATERIAL_NUMBERS else v for k, v in row.items()} for row in rows]
+
+
+class Catalogs():
+    # material tables (or compiled CatalogIndexes) by name, loaded on first use
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self._tables = {}
+        return None
+
+    def __getitem__(self, name):
+        if name not in self._tables:
+            paths = [self.directory / f"{name}{suffix}" for suffix in (".index.json", ".json", ".csv")]
+            matches = [p for p in paths if p.exists()]
+            if not matches:
+                raise KeyError(f"material catalog {name!r} not found in {self.directory}")
+            if matches[0] == paths[0]:
+                self._tables[name] = CatalogIndex.load(matches[0])
+            else:
+                self._tables[name] = load_catalog(matches[0])
+        return self._tables[name]
+
+
+def segment_value(record, name):
+    value = record.get(name)
+    if value is None or value == "":
+        return DEFAULTS[name]
+    return float(value)
+
+
+def design_chunk(records, catalogs, top_n=3, max_layers=4, executor=None):
+    """
+    Design a chunk of segments. Traffic and SN are computed for the whole chunk at once,
+    and sections are solved in the executor's processes when one is given; its workers need
+    the catalogs from parallelsolve.set_catalogs.
+
+    Returns:
+    list: one result dict per record
+    """
+    column = lambda name: np.array([segment_value(r, name) for r in records])
+    adt = np.array([float(r["adt"]) for r in records])
+    years = column("service_years").astype(int)
+    trips = traffic.total_trips(adt, years, column("growth_rate") / 100)
+    esals = traffic.design_esals(adt, years, column("growth_rate") / 100, column("trucks") / 100,
+                                 column("distribution") / 100, column("lane_distribution") / 100, column("lef"))
+    sn, converged = aashto93.solve_sn(column("reliability") / 100, column("standard_error") / 100,
+                                      column("serviceability_change"), column("soil_resilient_modulus"), esals,
+                                      full_output=True)
+    sn, converged = np.atleast_1d(sn), np.atleast_1d(converged)
+    goals = [float(r["goal_sn"]) if r.get("goal_sn") not in (None, "") else float(s) if c else None
+             for r, s, c in zip(records, sn, converged)]
+    # jobs name their catalog, which workers load once (see run)
+    jobs = [(r["catalog"], goal, segment_value(r, "typical_profile_height"),
+             segment_value(r, "embankment_cost"), segment_value(r, "excavation_cost"))
+            for r, goal in zip(records, goals)]
+    # segments without a goal are not solved
+    solvable = [job for job in jobs if job[1] is not None]
+    if executor is not None:
+        solved = parallelsolve.solve_many(solvable, top_n=top_n, max_layers=max_layers, executor=executor)
+    else:
+        solved = [parallelsolve.solve_job(job, top_n, max_layers, catalogs) for job in solvable]
+    solved = iter(solved)
+    results = []
+    for record, t, e, s, c, goal, job in zip(records, trips, esals, sn, converged, goals, jobs):
+        sections = [] if goal is None else next(solved)
+        results.append({
+            "segment": record.get("segment"),
+            "trips": float(t),
+            "esals": float(e),
+            "structural_number": float(s) if c else None,
+            "converged": bool(c),
+            "goal_sn": goal,
+            "sections": [{
+                "rank": rank,
+                "cost": solvesection.section_cost(section, *job[2:]),
+                "structural_number": solvesection.section_sn(section),
+                "layers": [{"name": l.name, "thickness": l.thickness} for l in section],
+            } for rank, section in enumerate(sections, 1)],
+        })
+    return results
+
+
+class JsonLinesWriter():
+    def __init__(self, f):
+        self.f = f
+        return None
+
+    def write(self, result):
+        self.f.write(json.dumps(result) + "\n")
+
+
+class CsvWriter():
+    # one row per section, or a single row without one if none was found
+    fields = ["segment", "trips", "esals", "structural_number", "converged", "goal_sn", "rank", "cost", "section_sn",
+              "layers"]
+
+    def __init__(self, f):
+        self.writer = csv.DictWriter(f, fieldnames=self.fields)
+        if f.tell() == 0:
+            self.writer.writeheader()
+        return None
+
+    def write(self, result):
+        base = {k: result[k] for k in self.fields[:6]}
+        if not result["sections"]:
+            self.writer.writerow(base)
+        for section in result["sections"]:
+            layers = "; ".join(f"{l['name']} {l['thickness']:g}in" for l in section["layers"])
+            self.writer.writerow(dict(base, rank=section["rank"], cost=round(section["cost"], 2),
+                                      section_sn=round(section["structural_number"], 3), layers=layers))
+
+
+def read_checkpoint(path):
+    if path is None or not Path(path).exists():
+        return {"rows": 0, "output_bytes": 0}
+    return json.loads(Path(path).read_text())
+
+
+def write_checkpoint(path, rows, output_bytes):
+    temporary = Path(f"{path}.tmp")
+    temporary.write_text(json.dumps({"rows": rows, "output_bytes": output_bytes}))
+    os.replace(temporary, path)
+
+
+def run(segments, catalog_dir, output, checkpoint=None, top_n=3, max_layers=4, chunk_size=256, workers=1):
+    """
+    Design every segment of a file, streaming results to output.
+
+    With a checkpoint, progress is recorded after every chunk, and a later run with the same
+    arguments drops any output written after the last checkpoint and continues from there.
+
+    Returns:
+    int: number of segments designed in this run
+    """
+    state = read_checkpoint(checkpoint)
+    catalogs = Catalogs(catalog_dir)
+    output = Path(output)
+    if not output.exists():
+        state = {"rows": 0, "output_bytes": 0}
+    designed = 0
+    # workers get the (still empty) loader and read each catalog from disk on first use
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=parallelsolve.set_catalogs,
+                                   initargs=(Catalogs(catalog_dir),)) if workers > 1 else None
+    try:
+        with open(output, "r+" if state["rows"] else "w", newline="") as f:
+            f.seek(state["output_bytes"])
+            f.truncate()
+            writer = CsvWriter(f) if output.suffix.lower() == ".csv" else JsonLinesWriter(f)
+            records = islice(read_segments(segments), state["rows"], None)
+            rows = state["rows"]
+            while True:
+                chunk = list(islice(records, chunk_size))
+                if not chunk:
+                    break
+                for result in design_chunk(chunk, catalogs, top_n, max_layers, executor):
+                    writer.write(result)
+                f.flush()
+                os.fsync(f.fileno())
+                rows += len(chunk)
+                designed += len(chunk)
+                if checkpoint is not None:
+                    write_checkpoint(checkpoint, rows, f.tell())
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return designed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Design pavement sections for a file of street segments.")
+    parser.add_argument("segments", help="CSV or Parquet file of segments")
+    parser.add_argument("--catalog-dir", required=True, help="directory of material catalogs (.index.json, .json or .csv)")
+    parser.add_argument("-o", "--output", required=True, help="results file (.jsonl or .csv)")
+    parser.add_argument("--checkpoint", help="checkpoint file used to resume an interrupted run")
+    parser.add_argument("--top-n", type=int, default=3, help="sections per segment")
+    parser.add_argument("--max-layers", type=int, default=4)
+    parser.add_argument("--chunk-size", type=int, default=256, help="segments per chunk")
+    parser.add_argument("--workers", type=int, default=1, help="processes used to solve sections")
+    args = parser.parse_args(argv)
+    designed = run(args.segments, args.catalog_dir, args.output, args.checkpoint, args.top_n, args.max_layers,
+                   args.chunk_size, args.workers)
+    print(f"designed {designed} segments", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
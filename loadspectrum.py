@@ -0,0 +1,96 @@
+"""
+ESALs from axle load spectra.
+
+A LoadSpectrum holds weigh-in-motion style histograms: axle counts per year for each
+axle weight bin and axle group (1 = single, 2 = tandem, 3 = tridem). ESALs are the counts
+weighted by aashto93.flexible_equivalent_single_axle_load, evaluated for every bin at once.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+import aashto93
+
+
+class LoadSpectrum():
+    def __init__(self, weights, axles, counts):
+        """
+        Parameters:
+        weights (array_like): axle group weight of each bin (lb), shape (W,)
+        axles (array_like): number of axles of each group type, shape (A,)
+        counts (array_like): axle group counts, shape (years, W, A), or (W, A) for a single year
+        """
+        self.weights = np.asarray(weights, dtype=float)
+        self.axles = np.asarray(axles, dtype=int)
+        counts = np.asarray(counts, dtype=float)
+        self.counts = counts[None] if counts.ndim == 2 else counts
+        if self.counts.shape[1:] != (len(self.weights), len(self.axles)):
+            raise ValueError(f"counts shape {counts.shape} does not match {len(self.weights)} weights x {len(self.axles)} axle groups")
+        return None
+
+    @property
+    def years(self):
+        return self.counts.shape[0]
+
+    @classmethod
+    def from_axle_records(cls, weights, axles, bin_width=1000.0, max_weight=None, axle_groups=(1, 2, 3)):
+        """
+        Histogram a year of individual axle group records (weight in lb, number of axles).
+
+        Bins are bin_width wide and represented by their center weight.
+        """
+        weights = np.asarray(weights, dtype=float)
+        axles = np.asarray(axles, dtype=int)
+        max_weight = weights.max() if max_weight is None else max_weight
+        bins = int(np.ceil(max_weight / bin_width)) or 1
+        weight_bin = np.minimum((weights // bin_width).astype(int), bins - 1)
+        group = np.searchsorted(axle_groups, axles)
+        known = (group < len(axle_groups)) & (np.asarray(axle_groups)[np.minimum(group, len(axle_groups) - 1)] == axles)
+        counts = np.bincount(weight_bin[known] * len(axle_groups) + group[known], minlength=bins * len(axle_groups))
+        centers = (np.arange(bins) + 0.5) * bin_width
+        return cls(centers, axle_groups, counts.reshape(bins, len(axle_groups)))
+
+    def project(self, years, growth):
+        """
+        Spectrum over years of service, growing the last year of counts at a constant rate.
+        """
+        factors = (1 + growth) ** np.arange(1, years - self.years + 1)
+        grown = self.counts[-1][None] * factors[:, None, None]
+        return LoadSpectrum(self.weights, self.axles, np.concatenate([self.counts, grown])[:years])
+
+
+@lru_cache(maxsize=256)
+def _lef_table(weights, axles, pt, sn):
+    lef = aashto93.flexible_equivalent_single_axle_load(np.array(weights)[:, None], np.array(axles)[None, :], pt, sn)
+    lef.setflags(write=False)
+    return lef
+
+
+def lef_table(weights, axles, pt, sn):
+    """
+    Load equivalency factor of every (weight, axle group) bin, shape (W, A).
+
+    Tables are cached per (weights, axles, pt, SN) since the same spectrum is re-evaluated
+    while the structural number iterates during design.
+    """
+    return _lef_table(tuple(np.asarray(weights, dtype=float).tolist()), tuple(np.asarray(axles, dtype=int).tolist()),
+                      float(pt), float(sn))
+
+
+def spectrum_esals(spectrum, pt, sn, direction_factor=1.0, lane_factor=1.0):
+    """
+    ESALs of every year of a load spectrum.
+
+    Parameters:
+    spectrum (LoadSpectrum): axle group counts
+    pt (float): terminal serviceability
+    sn (float): structural number
+    direction_factor (float): share of the counts in the design direction
+    lane_factor (float): share of the directional counts in the design lane
+
+    Returns:
+    ndarray: ESALs per year
+    """
+    lef = lef_table(spectrum.weights, spectrum.axles, pt, sn)
+    equivalent = np.einsum("ywa,wa->y", spectrum.counts, lef)
+    return aashto93.trips_to_esals(equivalent, direction_factor, lane_factor, 1.0)
@@ -0,0 +1,114 @@
+"""
+Multi-process versions of solvesection.solve.
+
+solve_parallel spreads the stacks of one problem over a process pool and merges the
+per-shard rankings; solve_many runs many independent problems (street segments of a
+bid package) concurrently. Both give the same sections as solvesection.solve.
+
+Jobs of solve_many may name their material table instead of carrying it. The tables are
+then sent to every worker process once, by the pool initializer set_catalogs, rather than
+pickled with every job.
+"""
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import solvesection
+from catalog import CatalogIndex
+
+
+JOB_FIELDS = ("material_table", "goal_sn", "grade", "embankment_cost", "excavation_cost")
+
+# material tables by name of this process, set by set_catalogs
+_catalogs = {}
+
+
+def set_catalogs(catalogs):
+    """
+    Pool initializer: make catalogs (a mapping of name to material table or CatalogIndex)
+    available to the jobs run in this process.
+    """
+    global _catalogs
+    _catalogs = catalogs if catalogs is not None else {}
+
+
+def shard_rows(count, shards):
+    # deal stacks round robin so every shard gets a similar mix of 1-4 layer stacks
+    rows = np.arange(count)
+    return [rows[i::shards] for i in range(min(shards, count))]
+
+
+def _rank_shard(task):
+    material_table, stack_index, rows, goal_sn, grade, embankment_cost, excavation_cost, top_n = task
+    material_list = solvesection.make_material_list(material_table)
+    return solvesection.rank_stacks(material_list, stack_index, goal_sn, grade, embankment_cost,
+                                    excavation_cost, top_n, rows)
+
+
+def solve_parallel(material_table, goal_sn, grade=0.0, embankment_cost=0.0, excavation_cost=0.0, top_n=3,
+                   max_layers=4, workers=None, shards=None):
+    """
+    solvesection.solve with the stacks split over a process pool.
+
+    Stacks are enumerated once and dealt into deterministic shards (shards defaults to four
+    per worker). Each worker fits and ranks its shard, and the shard rankings are merged on
+    (cost, stack row), so the result does not depend on the number of workers or shards.
+
+    Returns:
+    list: Sections ordered by cost
+    """
+    workers = workers or os.cpu_count()
+    shards = shards or 4 * workers
+    material_list = solvesection.make_material_list(material_table)
+    stack_index = solvesection.enumerate_stack_index(solvesection.MaterialArrays(material_list), max_layers)
+    tasks = [(list(material_table), stack_index[rows], rows, goal_sn, grade, embankment_cost, excavation_cost, top_n)
+             for rows in shard_rows(len(stack_index), shards)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        rankings = list(pool.map(_rank_shard, tasks))
+    merged = heapq.merge(*rankings, key=lambda r: r[:2])
+    if top_n is not None:
+        merged = list(merged)[:top_n]
+    return [section for _, _, section in merged]
+
+
+def solve_job(job, top_n=3, max_layers=4, catalogs=None):
+    # one solve_many job; a compiled CatalogIndex may stand in for the material table, and a
+    # name is looked up in catalogs (by default the ones given to set_catalogs)
+    job = dict(job) if isinstance(job, dict) else dict(zip(JOB_FIELDS, job))
+    material_table = job.pop("material_table")
+    if isinstance(material_table, str):
+        material_table = (_catalogs if catalogs is None else catalogs)[material_table]
+    if isinstance(material_table, CatalogIndex):
+        return material_table.solve(top_n=top_n, max_layers=max_layers, **job)
+    return solvesection.solve(material_table, top_n=top_n, max_layers=max_layers, **job)
+
+
+def _solve_job(task):
+    job, top_n, max_layers = task
+    return solve_job(job, top_n, max_layers)
+
+
+def solve_many(jobs, top_n=3, max_layers=4, workers=None, chunksize=1, executor=None, catalogs=None):
+    """
+    Solve many independent problems concurrently.
+
+    Parameters:
+    jobs (iterable): solvesection.solve arguments for each problem, either a tuple
+        (material_table, goal_sn, grade, embankment_cost, excavation_cost) or a dict of the same names;
+        the material table may be a catalog.CatalogIndex or the name of one of catalogs
+    workers (int): number of processes, defaults to the number of cores
+    executor (Executor): existing pool to use instead of starting one; named tables must have been
+        given to its workers with initializer=set_catalogs
+    catalogs (Mapping): material tables by name, sent to each worker of the new pool once
+
+    Returns:
+    list: the solve result of every job, in job order
+    """
+    tasks = [(job, top_n, max_layers) for job in jobs]
+    if executor is not None:
+        return list(executor.map(_solve_job, tasks, chunksize=chunksize))
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=set_catalogs,
+                             initargs=(catalogs,)) as pool:
+        return list(pool.map(_solve_job, tasks, chunksize=chunksize))
@@ -0,0 +1,126 @@
+"""
+Size-bounded Plotly payloads for large clouds of sections.
+
+Plotting every evaluated section as its own SVG marker makes the JSON and the browser
+render time grow with the population. point_cloud_traces instead returns, as plain trace
+dicts:
+
+- a density heatmap of the whole population, binned here on the server,
+- a WebGL scatter of at most budget points: the extremes, the Pareto front (most SN for
+  the cost) and one point per occupied cell of a coarse grid,
+
+with coordinates rounded to a few decimals and written as plain lists, so the JSON is the
+same whichever Plotly version serializes it. The payload size depends on the budget and
+the bins, not on the number of sections.
+"""
+import numpy as np
+
+
+def plain(values, decimals=3):
+    # rounded nested list, NaN as None (null in JSON)
+    values = np.round(np.asarray(values, dtype=float), decimals)
+    return np.where(np.isnan(values), None, values).tolist()
+
+
+def pareto_mask(sn, cost):
+    # points no other point beats with at least the SN for a lower cost (or more SN for the same)
+    sn = np.asarray(sn, dtype=float)
+    cost = np.asarray(cost, dtype=float)
+    order = np.lexsort((cost, -sn))
+    best = np.concatenate([[np.inf], np.minimum.accumulate(cost[order])[:-1]])
+    mask = np.zeros(len(sn), dtype=bool)
+    mask[order] = cost[order] < best
+    return mask
+
+
+def extreme_mask(*columns):
+    mask = np.zeros(len(columns[0]), dtype=bool)
+    for values in columns:
+        if len(values):
+            mask[[np.argmin(values), np.argmax(values)]] = True
+    return mask
+
+
+def evenly(indices, count):
+    # count entries spread evenly over indices, including both ends
+    if len(indices) <= count:
+        return indices
+    return indices[np.unique(np.linspace(0, len(indices) - 1, count).round().astype(int))]
+
+
+def downsample(x, y, budget=1500, grid=None, seed=0):
+    """
+    Indices of at most budget points that keep the shape of a point cloud.
+
+    Extremes and the Pareto front are always kept (the front is thinned evenly if it
+    alone exceeds half the budget). The rest of the budget goes to one point per occupied
+    cell of a grid over the cloud, so sparse outliers survive and dense areas are thinned.
+
+    Returns:
+    ndarray: sorted indices into x and y
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if len(x) <= budget:
+        return np.arange(len(x))
+    front = np.flatnonzero(pareto_mask(x, y))
+    front = evenly(front[np.argsort(x[front])], budget // 2)
+    keep = np.zeros(len(x), dtype=bool)
+    keep[front] = True
+    keep |= extreme_mask(x, y)
+    remaining = budget - keep.sum()
+    grid = grid or int(np.ceil(np.sqrt(budget)))
+    span = lambda v: (v - v.min()) / (np.ptp(v) or 1.0)
+    cells = np.minimum((span(x) * grid).astype(int), grid - 1) * grid + np.minimum((span(y) * grid).astype(int), grid - 1)
+    others = np.flatnonzero(~keep)
+    _, first = np.unique(cells[others], return_index=True)
+    picks = others[first]
+    if len(picks) > remaining:
+        picks = np.random.default_rng(seed).choice(picks, remaining, replace=False)
+    keep[picks] = True
+    return np.flatnonzero(keep)
+
+
+def density(x, y, bins=(80, 50)):
+    """
+    Counts of points on a bins grid, empty cells as NaN so they render transparent.
+
+    Returns:
+    tuple: (x centers, y centers, counts of shape (y bins, x bins))
+    """
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins=bins)
+    counts = np.where(counts > 0, counts, np.nan).T
+    return (x_edges[:-1] + x_edges[1:]) / 2, (y_edges[:-1] + y_edges[1:]) / 2, counts
+
+
+def point_cloud_traces(x, y, text=None, name="Sections", budget=1500, bins=(80, 50), decimals=3):
+    """
+    Plotly trace dicts for a cloud of (SN, cost) points.
+
+    Parameters:
+    x, y (array_like): point coordinates
+    text (callable): hover label of a point index, only called for plotted points
+    budget (int): most points plotted individually; larger clouds also get a density layer
+    decimals (int): decimals of the plotted coordinates
+
+    Returns:
+    list: trace dicts for fig.add_trace
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    traces = []
+    shown = downsample(x, y, budget)
+    if len(shown) < len(x):
+        cx, cy, counts = density(x, y, bins)
+        traces.append(dict(type="heatmap", x=plain(cx, decimals), y=plain(cy, decimals),
+                           z=plain(counts, 0), colorscale="Greys", showscale=False, opacity=0.6,
+                           name=f"{name} (density)", hovertemplate="SN %{x:.2f}<br>$%{y:.2f}<br>%{z} sections"
+                                                                   "<extra></extra>"))
+    front = pareto_mask(x[shown], y[shown])
+    for mask, label, marker in ((~front, name, dict(size=5, opacity=0.6)),
+                                (front, f"{name} (Pareto front)", dict(size=7, symbol="diamond"))):
+        index = shown[mask]
+        traces.append(dict(type="scattergl", mode="markers", name=label, marker=marker,
+                           x=plain(x[index], decimals), y=plain(y[index], decimals),
+                           text=None if text is None else [text(i) for i in index]))
+    return traces
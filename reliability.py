@@ -0,0 +1,177 @@
+"""
+Monte Carlo reliability of pavement sections.
+
+Design uses reliability only through the fixed z*so term of predict_pavement_esal. Here
+the inputs are drawn from their distributions instead: traffic growth, truck share,
+subgrade resilient modulus, the layer coefficient of every material and the model error
+(so times a standard normal draw). A section fails a sample when its predicted ESAL
+capacity is below the design ESALs of that sample's traffic.
+
+Samples are drawn and evaluated in batches for all sections at once. Only running
+failure counts and margin moments are kept, so memory does not grow with the number of
+samples, and sampling stops once every failure probability is known to the requested
+precision.
+"""
+from statistics import NormalDist
+
+import numpy as np
+
+import aashto93
+import traffic
+
+
+def lognormal(rng, mean, cov, size):
+    # lognormal draws with the given mean and coefficient of variation
+    sigma = np.sqrt(np.log1p(np.square(cov)))
+    return rng.lognormal(np.log(mean) - sigma**2 / 2, sigma, size)
+
+
+def wilson_interval(failures, samples, confidence=0.95):
+    """
+    Wilson score interval of a failure probability.
+
+    Returns:
+    tuple: (lower, upper) arrays
+    """
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    samples = np.maximum(samples, 1)
+    p = failures / samples
+    center = (p + z**2 / (2 * samples)) / (1 + z**2 / samples)
+    half = z / (1 + z**2 / samples) * np.sqrt(p * (1 - p) / samples + z**2 / (4 * samples**2))
+    return np.clip(center - half, 0.0, 1.0), np.clip(center + half, 0.0, 1.0)
+
+
+class FailureStatistics():
+    """
+    Running failure counts and log10 safety margin moments of several sections.
+
+    Margins are merged batch by batch (Chan's parallel variance update).
+    """
+    def __init__(self, sections):
+        self.samples = 0
+        self.failures = np.zeros(sections, dtype=np.int64)
+        self.margin_mean = np.zeros(sections)
+        self._margin_m2 = np.zeros(sections)
+        return None
+
+    def update(self, margin):
+        """
+        Add a batch of log10(capacity / demand), shape (samples, sections).
+        """
+        n = len(margin)
+        if n == 0:
+            return
+        self.failures += (margin < 0).sum(axis=0)
+        mean = margin.mean(axis=0)
+        m2 = ((margin - mean)**2).sum(axis=0)
+        total = self.samples + n
+        delta = mean - self.margin_mean
+        self.margin_mean = self.margin_mean + delta * n / total
+        self._margin_m2 = self._margin_m2 + m2 + delta**2 * self.samples * n / total
+        self.samples = total
+
+    @property
+    def probability(self):
+        return self.failures / max(self.samples, 1)
+
+    @property
+    def margin_sd(self):
+        return np.sqrt(self._margin_m2 / max(self.samples - 1, 1))
+
+    def interval(self, confidence=0.95):
+        return wilson_interval(self.failures, self.samples, confidence)
+
+    def converged(self, tolerance, relative_tolerance, confidence=0.95):
+        # interval half width within the absolute or the relative tolerance, per section
+        lower, upper = self.interval(confidence)
+        return (upper - lower) / 2 <= np.maximum(tolerance, relative_tolerance * self.probability)
+
+
+class ReliabilityResult():
+    def __init__(self, names, statistics, confidence, converged):
+        self.names = names  # section descriptions
+        self.samples = statistics.samples
+        self.failure_probability = statistics.probability
+        self.lower, self.upper = statistics.interval(confidence)
+        self.confidence = confidence
+        self.margin_mean = statistics.margin_mean
+        self.margin_sd = statistics.margin_sd
+        self.converged = converged
+        return None
+
+    @property
+    def reliability(self):
+        return 1 - self.failure_probability
+
+    def as_dicts(self):
+        return [{"section": name, "failure_probability": float(p), "lower": float(lo), "upper": float(hi),
+                 "reliability": float(1 - p), "margin_mean": float(m), "margin_sd": float(sd), "converged": bool(c)}
+                for name, p, lo, hi, m, sd, c in zip(self.names, self.failure_probability, self.lower, self.upper,
+                                                     self.margin_mean, self.margin_sd, self.converged)]
+
+
+def section_matrix(sections):
+    """
+    Materials of a list of sections and their thicknesses.
+
+    Returns:
+    tuple: (one Layer per distinct material name, thickness matrix of shape (materials, sections))
+    """
+    materials = {}
+    for section in sections:
+        for layer in section:
+            materials.setdefault(layer.name, layer)
+    names = list(materials)
+    thickness = np.zeros((len(names), len(sections)))
+    for j, section in enumerate(sections):
+        for layer in section:
+            thickness[names.index(layer.name), j] += layer.thickness
+    return list(materials.values()), thickness
+
+
+def failure_probability(sections, adt, years, growth, trucks, direction_factor, lane_factor, equivalent_load,
+                        psi, mr, so, growth_sd=0.01, trucks_cov=0.2, mr_cov=0.3, coefficient_cov=0.1,
+                        max_samples=1_000_000, batch_size=100_000, tolerance=1e-3, relative_tolerance=0.05,
+                        confidence=0.95, rng=None):
+    """
+    Probability that each section carries less than the design traffic.
+
+    Parameters:
+    sections (list): Sections, e.g. from solvesection.solve
+    adt, years, growth, trucks, direction_factor, lane_factor, equivalent_load: mean traffic
+        as in traffic.design_esals (growth and trucks as fractions)
+    psi (float): allowable serviceability loss
+    mr (float): mean subgrade resilient modulus (psi)
+    so (float): standard error of the performance model
+    growth_sd (float): standard deviation of the annual growth rate
+    trucks_cov, mr_cov, coefficient_cov (float): coefficients of variation of the truck
+        share, resilient modulus and layer coefficients (lognormal)
+    max_samples (int): sampling budget
+    batch_size (int): samples drawn and evaluated at once
+    tolerance, relative_tolerance (float): stop once the confidence interval half width of
+        every section is within tolerance or relative_tolerance times its probability;
+        0 for both draws max_samples
+    rng (int or Generator): random seed or generator
+
+    Returns:
+    ReliabilityResult
+    """
+    rng = np.random.default_rng(rng)
+    materials, thickness = section_matrix(sections)
+    coefficients = np.array([layer.sn for layer in materials])
+    statistics = FailureStatistics(len(sections))
+    converged = np.zeros(len(sections), dtype=bool)
+    while statistics.samples < max_samples:
+        n = min(batch_size, max_samples - statistics.samples)
+        growth_draw = np.maximum(rng.normal(growth, growth_sd, n), -0.99)
+        demand = traffic.design_esals(adt, years, growth_draw, lognormal(rng, trucks, trucks_cov, n),
+                                      direction_factor, lane_factor, equivalent_load)
+        sn = lognormal(rng, coefficients, coefficient_cov, (n, len(coefficients))) @ thickness
+        capacity = aashto93.predict_pavement_log_esal(rng.standard_normal((n, 1)), so, sn, psi,
+                                                      lognormal(rng, mr, mr_cov, (n, 1)))
+        statistics.update(capacity - np.log10(demand)[:, None])
+        converged = statistics.converged(tolerance, relative_tolerance, confidence)
+        if converged.all():
+            break
+    names = [" / ".join(f"{l.thickness:g}in {l.name}" for l in section) for section in sections]
+    return ReliabilityResult(names, statistics, confidence, converged)
@@ -0,0 +1,134 @@
+"""
+Content addressed result cache shared by the views.
+
+Keys are a hash of the canonical JSON form of the inputs, so equal parameters give equal
+keys regardless of dict ordering or int/float spelling. Entries are kept in memory with
+LRU eviction by count and size, and optionally mirrored to a directory so they survive
+worker restarts.
+"""
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from collections import OrderedDict
+from collections.abc import Mapping
+from pathlib import Path
+
+
+def canonical(value):
+    # JSON-ready form of value with a single spelling for equal inputs
+    if isinstance(value, Mapping):
+        return {str(k): canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [canonical(v) for v in value]
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if hasattr(value, "tolist"):
+        return canonical(value.tolist())
+    return repr(float(value))
+
+
+def make_key(*parts):
+    text = json.dumps(canonical(parts), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class ResultCache():
+    def __init__(self, max_entries=128, max_bytes=None, directory=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.directory = Path(directory) if directory else None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._bytes = 0
+        if self.directory:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        return None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries or (self.directory is not None and self._path(key).exists())
+
+    def get(self, key, default=None):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][0]
+        if self.directory:
+            path = self._path(key)
+            try:
+                data = path.read_bytes()
+                value = pickle.loads(data)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                pass
+            else:
+                os.utime(path)
+                self._remember(key, value, len(data))
+                self.hits += 1
+                return value
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._remember(key, value, len(data))
+        if self.directory:
+            handle, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(handle, "wb") as f:
+                f.write(data)
+            os.replace(temporary, self._path(key))
+            self._prune_directory()
+        return value
+
+    def get_or_compute(self, key, compute):
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = self.put(key, compute())
+        return value
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+        if self.directory:
+            for path in self.directory.glob("*.pkl"):
+                path.unlink(missing_ok=True)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "evictions": self.evictions,
+        }
+
+    def _path(self, key):
+        return self.directory / f"{key}.pkl"
+
+    def _remember(self, key, value, size):
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (value, size)
+        self._bytes += size
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or
+                                          (self.max_bytes is not None and self._bytes > self.max_bytes)):
+            _key, (_value, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def _prune_directory(self):
+        # same limits on disk, least recently used (oldest mtime) first
+        files = sorted(self.directory.glob("*.pkl"), key=lambda p: p.stat().st_mtime)
+        sizes = [p.stat().st_size for p in files]
+        total = sum(sizes)
+        while len(files) > max(self.max_entries, 1) or (self.max_bytes is not None and total > self.max_bytes and len(files) > 1):
+            files.pop(0).unlink(missing_ok=True)
+            total -= sizes.pop(0)
@@ -0,0 +1,162 @@
+"""
+Precomputed structural number table for array sweeps.
+
+z*so and the resilient modulus only shift log10(ESAL) in predict_pavement_esal, so the
+structural number depends on two variables: the reduced load
+
+    u = log10(esal) - z*so - 2.32*log10(mr) + 8.07
+
+and psi. The table holds SN on a regular (u, psi) grid, solved offline with
+aashto93.solve_sn_array, and answers by bilinear interpolation. It is stored as a .npy
+file (memory mapped when loaded) with a JSON header next to it.
+
+The table pays off when SN is needed for many inputs at once: one interpolation over an
+array is much cheaper than solve_sn_array. A single design solve is as fast with
+aashto93.solve_sn, so the design view does not use the table. No table is shipped; build
+it before relying on it, otherwise solve_sn falls back to aashto93.solve_sn.
+
+Build the table with:
+
+    python sntable.py [path]
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+
+import aashto93
+
+TABLE_PATH = Path(__file__).parent / "data" / "sn_table.npy"
+
+_tables = {}
+
+
+def reduced_log_esal(z, so, mr, esal):
+    return np.log10(esal) - z*so - 2.32*np.log10(mr) + 8.07
+
+
+class SNTable():
+    def __init__(self, values, u_start, u_step, psi_start, psi_step, error_bound):
+        self.values = values
+        self.u_start = u_start
+        self.u_step = u_step
+        self.psi_start = psi_start
+        self.psi_step = psi_step
+        self.error_bound = error_bound
+        return None
+
+    @property
+    def u_stop(self):
+        return self.u_start + self.u_step*(self.values.shape[0]-1)
+
+    @property
+    def psi_stop(self):
+        return self.psi_start + self.psi_step*(self.values.shape[1]-1)
+
+    def contains(self, u, psi):
+        return (u >= self.u_start) & (u <= self.u_stop) & (psi >= self.psi_start) & (psi <= self.psi_stop)
+
+    def interpolate(self, u, psi):
+        # bilinear interpolation; only meaningful where contains() is true
+        x = np.clip((np.asarray(u, dtype=float) - self.u_start)/self.u_step, 0, self.values.shape[0]-1)
+        y = np.clip((np.asarray(psi, dtype=float) - self.psi_start)/self.psi_step, 0, self.values.shape[1]-1)
+        i = np.minimum(x.astype(int), self.values.shape[0]-2)
+        j = np.minimum(y.astype(int), self.values.shape[1]-2)
+        fx = x - i
+        fy = y - j
+        v = self.values
+        return ((v[i, j]*(1-fx) + v[i+1, j]*fx)*(1-fy) +
+                (v[i, j+1]*(1-fx) + v[i+1, j+1]*fx)*fy)
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.save(path, np.asarray(self.values))
+        header = {"u_start": self.u_start, "u_step": self.u_step, "psi_start": self.psi_start,
+                  "psi_step": self.psi_step, "error_bound": self.error_bound}
+        path.with_suffix(".json").write_text(json.dumps(header, indent=2))
+
+    @classmethod
+    def load(cls, path):
+        path = Path(path)
+        header = json.loads(path.with_suffix(".json").read_text())
+        return cls(np.load(path, mmap_mode="r"), **header)
+
+
+def build_table(u_range=(1.0, 12.0), u_step=0.01, psi_range=(1.0, 4.0), psi_step=0.05):
+    """
+    Solve the SN grid and its interpolation error bound.
+
+    The bound is the bilinear interpolation error estimate (hu^2*max|SN_uu| + hpsi^2*max|SN_psipsi|)/8,
+    with the second derivatives taken from grid differences, or the largest error found at the
+    cell centers if that is larger.
+
+    Returns:
+    SNTable: the table
+    """
+    u = np.arange(u_range[0], u_range[1] + u_step/2, u_step)
+    psi = np.arange(psi_range[0], psi_range[1] + psi_step/2, psi_step)
+    values = _solve_reduced(u[:, None], psi[None, :])
+    table = SNTable(values, float(u[0]), u_step, float(psi[0]), psi_step, 0.0)
+    sn_uu = np.abs(np.diff(values, 2, axis=0)).max()/u_step**2
+    sn_pp = np.abs(np.diff(values, 2, axis=1)).max()/psi_step**2
+    estimate = (u_step**2*sn_uu + psi_step**2*sn_pp)/8
+    u_mid = (u[:-1] + u_step/2)[:, None]
+    psi_mid = (psi[:-1] + psi_step/2)[None, :]
+    measured = np.abs(table.interpolate(u_mid, psi_mid) - _solve_reduced(u_mid, psi_mid)).max()
+    table.error_bound = float(max(estimate, measured))
+    return table
+
+
+def _solve_reduced(u, psi):
+    # z = so = 0 and 2.32*log10(mr) = 8.07 leave log10(esal) = u
+    sn, converged = aashto93.solve_sn_array(0.0, 0.0, psi, 10**(8.07/2.32), 10**u)
+    if not converged.all():
+        raise ValueError("structural number did not converge on the table grid")
+    return sn
+
+
+def load_table(path=TABLE_PATH):
+    """
+    The table at path, loaded on first use and memory mapped. None if it has not been built.
+
+    A missing table is not cached, so a table built later is picked up without a restart.
+    """
+    path = Path(path)
+    if path not in _tables:
+        if not path.exists():
+            return None
+        _tables[path] = SNTable.load(path)
+    return _tables[path]
+
+
+def solve_sn(z, so, psi, mr, esal, max_error=0.005, path=TABLE_PATH):
+    """
+    aashto93.solve_sn answered from the precomputed table.
+
+    Falls back to aashto93.solve_sn when the table is missing, its error bound is larger than
+    max_error or the inputs are outside of the table.
+    """
+    table = load_table(path)
+    if table is None or table.error_bound > max_error:
+        return aashto93.solve_sn(z, so, psi, mr, esal)
+    u = reduced_log_esal(z, so, mr, esal)
+    inside = table.contains(u, psi)
+    if np.all(inside):
+        sn = table.interpolate(u, psi)
+        return float(sn) if np.ndim(sn) == 0 else sn
+    if np.ndim(inside) == 0:
+        return aashto93.solve_sn(z, so, psi, mr, esal)
+    sn = np.where(inside, table.interpolate(u, psi), np.nan)
+    outside = ~inside
+    exact = aashto93.solve_sn(*[np.broadcast_to(v, inside.shape)[outside] for v in (z, so, psi, mr, esal)])
+    sn[outside] = exact
+    return sn
+
+
+if __name__ == "__main__":
+    import sys
+    target = Path(sys.argv[1]) if len(sys.argv) > 1 else TABLE_PATH
+    built = build_table()
+    built.save(target)
+    print(f"{target}: {built.values.shape[0]}x{built.values.shape[1]} grid, error bound {built.error_bound:.2e}")
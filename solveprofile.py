@@ -0,0 +1,46 @@
+"""
+Opt-in timing and counters for the section solver.
+
+Pass a SolveProfile to solvesection.solve (or the functions it calls) to record wall time
+per stage and candidate counts. Without one the solver uses NULL_PROFILE, whose methods
+do nothing.
+"""
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class SolveProfile():
+    def __init__(self):
+        self.stages = {}  # stage name -> seconds
+        self.counts = {}
+        return None
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name, n=1):
+        self.counts[name] = self.counts.get(name, 0) + int(n)
+
+    def total_seconds(self):
+        return sum(self.stages.values())
+
+    def as_dict(self):
+        return {"stages": dict(self.stages), "counts": dict(self.counts), "total_seconds": self.total_seconds()}
+
+
+class NullProfile():
+    _stage = nullcontext()
+
+    def stage(self, name):
+        return self._stage
+
+    def count(self, name, n=1):
+        pass
+
+
+NULL_PROFILE = NullProfile()
@@ -1,7 +1,9 @@
 import numpy as np
-import pandas as pd
 import random
-from copy import deepcopy
+from copy import copy
+from itertools import combinations, permutations, product
+
+from solveprofile import NULL_PROFILE
 
 
 class Layer():
@@ -51,14 +53,15 @@ def make_trial_section(material_list) -> Section:
     num_materials: int = np.random.randint(1, 5)
     section = Section()
     for _ in range(num_materials):
-        section.append(deepcopy(random.choice(material_list)))
+        section.append(copy(random.choice(material_list)))
     section.sort(key = lambda l : l.surface_code)
     section.reverse()
     section.sort(key = lambda l : l.subgrade_code)
     return section
 
 
-def validate_section(section):
+def validate_stack(section):
+    # the material rules of validate_section, independent of thickness
     # no duplicate courses of materials
     names = [l.name for l in section]
     if len(names) != len(set(names)):
@@ -74,12 +77,24 @@ def validate_section(section):
     alk_roll = np.roll(alk, 1)
     if np.logical_and(alk, alk_roll).any():
         return False
+    return True
+
+
+def valid_lift(thickness, min_lift, max_lift):
+    # thickness must be achievable within lift size limits (works on arrays)
+    return np.logical_not(np.logical_or(np.logical_not(thickness % min_lift < max_lift - min_lift),
+                                        thickness % max_lift == 0))
+
+
+def validate_section(section):
+    if not validate_stack(section):
+        return False
     # thickness must be a positive number
     if any([l.thickness <= 0 for l in section]):
         return False
     # thickness must be achievable within lift size limits
     for l in section:
-        if not l.thickness % l.min_lift < l.max_lift-l.min_lift or l.thickness % l.max_lift == 0:
+        if not valid_lift(l.thickness, l.min_lift, l.max_lift):
             return False
     return True
 
@@ -112,12 +127,16 @@ def section_cost(section, grade, embankment_cost, excavation_cost):
     return sum([l.cost_per_inch * l.thickness for l in section]) + earthwork
 
 
+def lift_increment(layer):
+    return 0.5 if layer.min_lift < 2.0 else 1.0
+
+
 def modify_thickness(section, goal_sn):
     epsilon = 0.01
     current_sn = section_sn(section)
     cost_index = [(i,l) for i,l in enumerate(section)]
     cost_index.sort(key=lambda x: x[1].cost_per_sn)
-    increment_size = lambda l: 0.5 if l.min_lift < 2.0 else 1.0
+    increment_size = lift_increment
     for _ in range(10):  # this may not benefit from multiple passes
         delta = goal_sn - current_sn
         if abs(delta) < epsilon:
@@ -129,22 +148,511 @@ def modify_thickness(section, goal_sn):
             inc = increment_size(layer)
             inc_sn_delta = layer.sn * inc
             adjustment = delta // inc_sn_delta if delta > 0 else np.ceil(delta / inc_sn_delta)
+            previous = layer.thickness
             layer.thickness += inc * adjustment
             if layer.thickness <= layer.min_lift:
                 layer.thickness = layer.min_lift
-            current_sn = section_sn(section)
+            current_sn += layer.sn * (layer.thickness - previous)
             delta = goal_sn - current_sn
     return section
 
 
-def solve(material_table, goal_sn, grade=0.0, embankment_cost=0.0, excavation_cost=0.0):
-    # this seems like it could be better.
-    material_list = make_material_list(material_table)
-    sample_population = 5000
-    trial_sections = [make_trial_section(material_list) for _ in range(sample_population)]
-    unique_sections = remove_duplicate_sections(trial_sections)
-    valid_sections = [s for s in unique_sections if validate_section(s)]
-    modified_sections = [modify_thickness(s, goal_sn) for s in valid_sections]
-    revalidated_sections = [s for s in modified_sections if validate_section(s)]
-    revalidated_sections.sort(key=lambda s: section_cost(s, grade, embankment_cost, excavation_cost))
-    return revalidated_sections
+class MaterialArrays():
+    """
+    Material list compiled into NumPy columns.
+
+    Sections are stored as a padded index matrix (one row per section, -1 for unused
+    positions, layers left aligned) with a matching thickness matrix. The last entry of
+    every column is an empty padding layer, so indexing a column with -1 reads zeros.
+    """
+    def __init__(self, material_list):
+        self.layers = list(material_list)
+        column = lambda attr, pad=0.0, dtype=float: np.array([getattr(l, attr) for l in self.layers] + [pad], dtype=dtype)
+        self.sn = column('sn')
+        self.cost_per_inch = column('cost_per_inch')
+        self.cost_per_sn = column('cost_per_sn')
+        self.min_lift = column('min_lift', 1.0)
+        self.max_lift = column('max_lift', 1.0)
+        self.surface_code = column('surface_code', 0, int)
+        self.subgrade_code = column('subgrade_code', 0, int)
+        self.alkaline_code = column('alkaline_code', 0, int)
+        self.increment = np.where(self.min_lift < 2.0, 0.5, 1.0)
+        names = [l.name for l in self.layers]
+        self.name_code = np.array([names.index(n) for n in names] + [-1])
+        return None
+
+    def __len__(self):
+        return len(self.layers)
+
+
+def compile_materials(material_table):
+    return MaterialArrays(make_material_list(material_table))
+
+
+def random_sections(arrays, count, max_layers=4, rng=None):
+    # batch version of make_trial_section
+    rng = np.random.default_rng(rng)
+    lengths = rng.integers(1, max_layers + 1, count)
+    index = rng.integers(0, len(arrays), (count, max_layers))
+    index = np.where(np.arange(max_layers) < lengths[:, None], index, -1)
+    return sort_stack_index(arrays, index)
+
+
+def sort_stack_index(arrays, index):
+    # surface courses first, subgrade treatments last and padding at the end (stable)
+    key = np.where(index >= 0, 1 - arrays.surface_code[index] + 2 * arrays.subgrade_code[index], 4)
+    return np.take_along_axis(index, np.argsort(key, axis=1, kind='stable'), axis=1)
+
+
+def initial_thickness(arrays, index):
+    return np.where(index >= 0, arrays.min_lift[index], 0.0)
+
+
+def batch_section_sn(arrays, index, thickness):
+    return (arrays.sn[index] * thickness).sum(axis=1)
+
+
+def batch_section_cost(arrays, index, thickness, grade, embankment_cost, excavation_cost):
+    earthwork = earthwork_cost(thickness.sum(axis=1), grade, embankment_cost, excavation_cost)
+    return (arrays.cost_per_inch[index] * thickness).sum(axis=1) + earthwork
+
+
+def batch_validate_stack(arrays, index):
+    # validate_stack for every row of an index matrix
+    rows = np.arange(len(index))
+    length = (index >= 0).sum(axis=1)
+    names = np.sort(arrays.name_code[index], axis=1)
+    duplicate = ((names[:, 1:] == names[:, :-1]) & (names[:, 1:] >= 0)).any(axis=1)
+    surface = arrays.surface_code[index[:, 0]] == 1
+    subgrade = arrays.subgrade_code[index].sum(axis=1) <= 1
+    alk = arrays.alkaline_code[index]
+    # same neighbours as np.roll in validate_stack, including last-to-first
+    adjacent = (alk[:, 1:] & alk[:, :-1]).any(axis=1) | (alk[:, 0] & alk[rows, np.maximum(length - 1, 0)]).astype(bool)
+    return (length > 0) & ~duplicate & surface & subgrade & ~adjacent
+
+
+def batch_validate_section(arrays, index, thickness):
+    real = index >= 0
+    min_lift = arrays.min_lift[index]
+    max_lift = arrays.max_lift[index]
+    positive = np.where(real, thickness > 0, True).all(axis=1)
+    lifts = np.where(real, valid_lift(thickness, min_lift, max_lift), True).all(axis=1)
+    return batch_validate_stack(arrays, index) & positive & lifts
+
+
+def batch_remove_duplicate_sections(arrays, index):
+    # keeps the first section of every material set, like remove_duplicate_sections
+    names = np.sort(arrays.name_code[index], axis=1)
+    _, first = np.unique(names, axis=0, return_index=True)
+    return index[np.sort(first)]
+
+
+def batch_modify_thickness(arrays, index, thickness, goal_sn):
+    """
+    modify_thickness for every row of an index matrix. goal_sn may be a scalar or one value per row.
+
+    Returns:
+    ndarray: the adjusted thickness matrix
+    """
+    epsilon = 0.01
+    thickness = np.array(thickness, dtype=float)
+    rows = np.arange(len(index))
+    goal_sn = np.broadcast_to(goal_sn, rows.shape)
+    sn = arrays.sn[index]
+    current_sn = (sn * thickness).sum(axis=1)
+    cost_order = np.argsort(np.where(index >= 0, arrays.cost_per_sn[index], np.inf), axis=1, kind='stable')
+    active = np.ones(len(index), dtype=bool)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for _ in range(10):
+            active &= np.abs(goal_sn - current_sn) >= epsilon
+            if not active.any():
+                break
+            for position in cost_order.T:
+                i = index[rows, position]
+                adjustable = active & (i >= 0) & (arrays.min_lift[i] != arrays.max_lift[i])
+                inc = arrays.increment[i]
+                inc_sn_delta = sn[rows, position] * inc
+                delta = goal_sn - current_sn
+                adjustment = np.where(delta > 0, delta // inc_sn_delta, np.ceil(delta / inc_sn_delta))
+                previous = thickness[rows, position]
+                modified = np.maximum(previous + inc * adjustment, arrays.min_lift[i])
+                modified = np.where(adjustable, modified, previous)
+                thickness[rows, position] = modified
+                current_sn += sn[rows, position] * (modified - previous)
+    return thickness
+
+
+def make_section(stack, thicknesses):
+    # Section of copies of the stack's layers at the given thicknesses
+    section = Section(copy(l) for l in stack)
+    for layer, thickness in zip(section, thicknesses):
+        layer.thickness = float(thickness)
+    return section
+
+
+def to_sections(arrays, index, thickness):
+    return [make_section([arrays.layers[i] for i in row if i >= 0], row_thickness)
+            for row, row_thickness in zip(index, thickness)]
+
+
+def order_stack(layers):
+    """
+    Arrange a set of layers into a stack accepted by validate_stack.
+
+    Layers are ordered the way make_trial_section orders them (surface courses on top,
+    subgrade treatment at the bottom) and the remaining permutations are tried in turn.
+
+    Returns:
+    Section: the first valid ordering, or None if the materials cannot be stacked
+    """
+    if not any(l.surface_code for l in layers) or sum(l.subgrade_code for l in layers) > 1:
+        return None
+    ordered = sorted(layers, key=lambda l: (-l.surface_code, l.subgrade_code))
+    for stack in permutations(ordered):
+        if validate_stack(stack):
+            return Section(stack)
+    return None
+
+
+def enumerate_stack_index(arrays, max_layers=4, profile=NULL_PROFILE):
+    """
+    Index matrix of every valid stack of 1 to max_layers distinct materials.
+
+    Each material set appears once, in the first ordering order_stack would pick for it.
+    """
+    stacks = []
+    for n in range(1, max_layers + 1):
+        sets = np.array(list(combinations(range(len(arrays)), n)), dtype=int).reshape(-1, n)
+        ordered, found = order_stack_sets(arrays, sets, max_layers)
+        profile.count("material_sets", len(sets))
+        profile.count("valid_stacks", found.sum())
+        stacks.append(ordered[found])
+    return np.concatenate(stacks)
+
+
+def order_stack_sets(arrays, sets, max_layers=4):
+    """
+    Arrange material sets (rows of ascending indices, all the same size) as order_stack would.
+
+    Returns:
+    tuple: (padded index matrix of the ordered stacks, mask of the sets that can be stacked)
+    """
+    n = sets.shape[1]
+    sets = sort_stack_index(arrays, sets)
+    ordered = np.full((len(sets), max_layers), -1)
+    found = np.zeros(len(sets), dtype=bool)
+    for order in permutations(range(n)):
+        candidates = sets[~found][:, order]
+        valid = batch_validate_stack(arrays, candidates)
+        rows = np.flatnonzero(~found)[valid]
+        ordered[rows, :n] = candidates[valid]
+        found[rows] = True
+        if found.all():
+            break
+    return ordered, found
+
+
+def enumerate_stacks(material_list, max_layers=4):
+    """
+    Generate every valid stack of 1 to max_layers distinct materials, one ordering per material set.
+    """
+    arrays = MaterialArrays(material_list)
+    for row in enumerate_stack_index(arrays, max_layers):
+        yield Section(arrays.layers[i] for i in row if i >= 0)
+
+
+def thickness_grid(layer, goal_sn, other_sn, grade=0.0, embankment_cost=0.0):
+    """
+    Constructible thicknesses of a layer on its lift grid.
+
+    The grid runs from the minimum lift up to the first thickness that reaches the goal
+    with every other layer at its minimum lift (other_sn); going thicker only adds cost
+    while every layer costs more per inch than the excavation credit (check_cost_bounded).
+    A material cheaper per inch than embankment also saves cost while it displaces fill,
+    so its grid runs at least up to the first thickness reaching the grade.
+    Layers with a fixed lift (min == max) are held at that lift.
+    """
+    if layer.min_lift == layer.max_lift:
+        grid = np.array([layer.min_lift])
+        grid = grid[valid_lift(grid, layer.min_lift, layer.max_lift)]
+    else:
+        inc = lift_increment(layer)
+        needed = max(goal_sn - other_sn, 0.0) / layer.sn
+        if layer.cost_per_inch < embankment_cost / 36:
+            needed = max(needed, grade)
+        top = layer.min_lift + np.ceil(max(needed - layer.min_lift, 0.0) / inc) * inc + layer.max_lift
+        grid = np.arange(layer.min_lift, top + inc / 2, inc)
+        grid = grid[valid_lift(grid, layer.min_lift, layer.max_lift)]
+        reaching = np.flatnonzero(grid >= needed - 1e-9)
+        if len(reaching):
+            grid = grid[:reaching[0] + 1]
+    return grid
+
+
+def check_cost_bounded(stack, excavation_cost):
+    """
+    Raise ValueError if a layer can be thickened for less than the excavation credit.
+
+    Below grade section_cost credits excavation_cost/36 per inch of depth, so such a layer
+    makes every section cheaper the thicker it gets and there is no cheapest section.
+    """
+    for layer in stack:
+        if layer.min_lift != layer.max_lift and layer.cost_per_inch < excavation_cost / 36:
+            raise ValueError(f"{layer.name} costs {layer.cost_per_inch:.3f} per inch, less than the excavation credit "
+                             f"of {excavation_cost / 36:.3f}; thicker sections are always cheaper")
+
+
+def earthwork_cost(total_thickness, grade, embankment_cost, excavation_cost):
+    # same earthwork term as section_cost, vectorized over total thickness
+    subgrade_elevation = grade - total_thickness
+    rate = np.where(subgrade_elevation > 0, embankment_cost / 36, excavation_cost / 36)
+    return rate * subgrade_elevation
+
+
+def pareto_rows(sn, cost, thickness):
+    """
+    Rows not dominated by another row of the same total thickness.
+
+    Earthwork only depends on the total thickness, so among combinations of equal thickness
+    one with less SN and no lower cost (or equal SN and higher cost) can never be cheaper.
+
+    Returns:
+    ndarray: indices of the kept rows, in their original order
+    """
+    thickness = np.round(thickness, 6)
+    order = np.lexsort((cost, -sn, thickness))
+    group = np.concatenate([[0], np.cumsum(np.diff(thickness[order]) != 0)])
+    # offset each group below the previous one so the running minimum restarts per group
+    span = cost.max() - cost.min() + 1.0 if len(cost) else 1.0
+    shifted = cost[order] - 2 * span * group
+    running = np.concatenate([[np.inf], np.minimum.accumulate(shifted)[:-1]])
+    return np.sort(order[shifted < running])
+
+
+class StackCombinations():
+    """
+    Thickness combinations of a stack, shared by fit_stack and fit_stack_frontier.
+
+    The layer with the longest thickness grid is left free. All others are enumerated over
+    their grids, and combinations beaten by another of the same total thickness are dropped
+    (pareto_rows). The rest_* arrays have one entry per remaining combination.
+    """
+    def __init__(self, stack, grids):
+        self.free = max(range(len(stack)), key=lambda i: len(grids[i]))
+        self.rest = [i for i in range(len(stack)) if i != self.free]
+        self.free_layer = stack[self.free]
+        self.free_grid = grids[self.free]
+        if self.rest:
+            rest_t = np.array(list(product(*[grids[i] for i in self.rest])))
+        else:
+            rest_t = np.zeros((1, 0))
+        rest_sn = rest_t @ np.array([stack[i].sn for i in self.rest])
+        rest_cost = rest_t @ np.array([stack[i].cost_per_inch for i in self.rest])
+        rest_thickness = rest_t.sum(axis=1)
+        kept = pareto_rows(rest_sn, rest_cost, rest_thickness)
+        self.rest_t, self.rest_sn, self.rest_cost, self.rest_thickness = (
+            rest_t[kept], rest_sn[kept], rest_cost[kept], rest_thickness[kept])
+        return None
+
+    def thicknesses(self, rest_t, free_t):
+        # layer thicknesses in stack order
+        thicknesses = np.empty(len(self.rest) + 1)
+        thicknesses[self.rest] = rest_t
+        thicknesses[self.free] = free_t
+        return thicknesses
+
+
+def stack_combinations(stack, goal_sn, grade=0.0, embankment_cost=0.0, excavation_cost=0.0):
+    """
+    StackCombinations of a stack on the thickness grids for goal_sn.
+
+    Returns:
+    StackCombinations or None if a layer has no constructible thickness
+    """
+    check_cost_bounded(stack, excavation_cost)
+    min_sn = [l.sn * l.min_lift for l in stack]
+    grids = [thickness_grid(l, goal_sn, sum(min_sn) - min_sn[i], grade, embankment_cost)
+             for i, l in enumerate(stack)]
+    if any(len(g) == 0 for g in grids):
+        return None
+    return StackCombinations(stack, grids)
+
+
+def fit_stack(stack, goal_sn, grade=0.0, embankment_cost=0.0, excavation_cost=0.0, profile=NULL_PROFILE):
+    """
+    Find the minimum section_cost thicknesses of a stack with a structural number of at least goal_sn.
+
+    All layers but one are enumerated over their thickness grids. For each combination the
+    remaining (free) layer cost is piecewise linear in its thickness, so its optimum is at
+    the thinnest thickness reaching the goal, next to the earthwork breakpoint or at the
+    top of its grid.
+
+    Returns:
+    tuple: (cost, thicknesses) or None if the goal cannot be reached
+    """
+    combos = stack_combinations(stack, goal_sn, grade, embankment_cost, excavation_cost)
+    if combos is None:
+        return None
+    free_layer, free_grid = combos.free_layer, combos.free_grid
+    rest_t, rest_sn, rest_cost, rest_thickness = (
+        combos.rest_t, combos.rest_sn, combos.rest_cost, combos.rest_thickness)
+    last = len(free_grid) - 1
+    first = np.searchsorted(free_grid * free_layer.sn, goal_sn - rest_sn - 1e-9)
+    feasible = first <= last
+    if not feasible.any():
+        return None
+    rest_t, rest_sn, rest_cost, rest_thickness, first = (
+        rest_t[feasible], rest_sn[feasible], rest_cost[feasible], rest_thickness[feasible], first[feasible])
+    breakpoint = np.searchsorted(free_grid, grade - rest_thickness)
+    candidates = np.stack([first, breakpoint - 1, breakpoint, np.full_like(first, last)], axis=1)
+    candidates = np.clip(candidates, first[:, None], last)
+    free_t = free_grid[candidates]
+    profile.count("thickness_combinations", free_t.size)
+    total = rest_thickness[:, None] + free_t
+    costs = (rest_cost[:, None] + free_t * free_layer.cost_per_inch
+             + earthwork_cost(total, grade, embankment_cost, excavation_cost))
+    row, col = np.unravel_index(np.argmin(costs), costs.shape)
+    return costs[row, col], combos.thicknesses(rest_t[row], free_t[row, col])
+
+
+def fit_stack_frontier(stack, sn_values, grade=0.0, embankment_cost=0.0, excavation_cost=0.0, profile=NULL_PROFILE):
+    """
+    fit_stack for many goal structural numbers at once.
+
+    Thickness grids and the combos of the non-free layers are built once, for the
+    largest goal. For every combination the cost of each free layer thickness is computed
+    once and turned into a suffix minimum, so the cheapest section reaching any goal is a
+    lookup at the thinnest free layer thickness that reaches it. The grids of the largest
+    goal contain those of every smaller goal, so this matches fit_stack.
+
+    Returns:
+    tuple: (costs, thicknesses) with one row per goal; unreachable goals cost inf
+    """
+    sn_values = np.asarray(sn_values, dtype=float)
+    costs = np.full(len(sn_values), np.inf)
+    thicknesses = np.full((len(sn_values), len(stack)), np.nan)
+    combos = stack_combinations(stack, sn_values.max(), grade, embankment_cost, excavation_cost)
+    if combos is None:
+        return costs, thicknesses
+    free_layer, free_grid = combos.free_layer, combos.free_grid
+    rest_t, rest_sn, rest_cost, rest_thickness = (
+        combos.rest_t, combos.rest_sn, combos.rest_cost, combos.rest_thickness)
+    best_row = np.zeros(len(sn_values), dtype=int)
+    chunk = max(1, 2_000_000 // len(free_grid))
+    for start in range(0, len(rest_t), chunk):
+        rows = slice(start, start + chunk)
+        free_cost = (rest_cost[rows, None] + free_grid * free_layer.cost_per_inch
+                     + earthwork_cost(rest_thickness[rows, None] + free_grid, grade, embankment_cost, excavation_cost))
+        profile.count("thickness_combinations", free_cost.size)
+        # cheapest thickness at or above each grid position, inf past the end of the grid
+        suffix = np.minimum.accumulate(free_cost[:, ::-1], axis=1)[:, ::-1]
+        suffix = np.concatenate([suffix, np.full((len(suffix), 1), np.inf)], axis=1)
+        first = np.searchsorted(free_grid * free_layer.sn, (sn_values - rest_sn[rows, None] - 1e-9).ravel())
+        chunk_costs = np.take_along_axis(suffix, first.reshape(len(suffix), -1), axis=1)
+        row = np.argmin(chunk_costs, axis=0)
+        cheaper = chunk_costs[row, np.arange(len(sn_values))] < costs
+        costs[cheaper] = chunk_costs[row, np.arange(len(sn_values))][cheaper]
+        best_row[cheaper] = start + row[cheaper]
+    for k in np.flatnonzero(np.isfinite(costs)):
+        row = best_row[k]
+        first = np.searchsorted(free_grid * free_layer.sn, sn_values[k] - rest_sn[row] - 1e-9)
+        candidates = free_grid[first:]
+        free_cost = (rest_cost[row] + candidates * free_layer.cost_per_inch
+                     + earthwork_cost(rest_thickness[row] + candidates, grade, embankment_cost, excavation_cost))
+        thicknesses[k] = combos.thicknesses(rest_t[row], candidates[np.argmin(free_cost)])
+    return costs, thicknesses
+
+
+def solve_frontier(material_table, sn_values, grade=0.0, embankment_cost=0.0, excavation_cost=0.0, max_layers=4,
+                   profile=NULL_PROFILE):
+    """
+    Cheapest section for each of several required structural numbers in a single pass.
+
+    Returns:
+    list: (goal_sn, cost, Section) for each value of sn_values, with cost inf and Section
+    None where no stack reaches the goal
+    """
+    sn_values = np.asarray(sn_values, dtype=float)
+    with profile.stage("materials"):
+        material_list = make_material_list(material_table)
+        arrays = MaterialArrays(material_list)
+    with profile.stage("enumerate"):
+        stack_index = enumerate_stack_index(arrays, max_layers, profile)
+    best_cost = np.full(len(sn_values), np.inf)
+    best = [None] * len(sn_values)
+    with profile.stage("fit"):
+        for stack_row in stack_index:
+            stack = [material_list[i] for i in stack_row if i >= 0]
+            costs, thicknesses = fit_stack_frontier(stack, sn_values, grade, embankment_cost, excavation_cost, profile)
+            profile.count("stacks_fitted")
+            # strict comparison keeps the earliest stack on ties, like solve
+            for k in np.flatnonzero(costs < best_cost):
+                best_cost[k] = costs[k]
+                best[k] = (stack, thicknesses[k])
+    frontier = []
+    for goal, cost, found in zip(sn_values, best_cost, best):
+        section = None if found is None else make_section(*found)
+        frontier.append((float(goal), float(cost), section))
+    return frontier
+
+
+def solve(material_table, goal_sn, grade=0.0, embankment_cost=0.0, excavation_cost=0.0, top_n=3, max_layers=4,
+          profile=NULL_PROFILE):
+    """
+    Find the lowest cost sections that reach goal_sn.
+
+    Every valid stack of up to max_layers materials is fitted with its minimum cost
+    thicknesses (fit_stack), and the stacks are ranked by section_cost.
+
+    Parameters:
+    material_table (list): rows of the material table
+    goal_sn (float): required structural number
+    grade (float): typical profile height (in)
+    embankment_cost (float): embankment cost ($/cyd)
+    excavation_cost (float): excavation cost ($/cyd)
+    top_n (int): number of sections to return, None for all of them
+    max_layers (int): maximum number of layers in a section
+    profile (SolveProfile): records stage times and candidate counts if given
+
+    Returns:
+    list: Sections ordered by cost, one per material combination
+    """
+    with profile.stage("materials"):
+        material_list = make_material_list(material_table)
+        arrays = MaterialArrays(material_list)
+    with profile.stage("enumerate"):
+        stack_index = enumerate_stack_index(arrays, max_layers, profile)
+    ranked = rank_stacks(material_list, stack_index, goal_sn, grade, embankment_cost, excavation_cost, top_n,
+                         profile=profile)
+    return [section for _, _, section in ranked]
+
+
+def rank_stacks(material_list, stack_index, goal_sn, grade=0.0, embankment_cost=0.0, excavation_cost=0.0,
+                top_n=None, rows=None, profile=NULL_PROFILE):
+    """
+    Fit every stack of an index matrix and rank them by cost.
+
+    Parameters:
+    material_list (list): Layers the index refers to
+    stack_index (ndarray): padded index matrix of stacks
+    rows (array_like): identifier of each stack used to break cost ties, defaults to its row number
+
+    Returns:
+    list: (cost, row, Section) of the top_n stacks that reach goal_sn
+    """
+    rows = range(len(stack_index)) if rows is None else rows
+    ranked = []
+    with profile.stage("fit"):
+        for row, stack_row in zip(rows, stack_index):
+            stack = [material_list[i] for i in stack_row if i >= 0]
+            fitted = fit_stack(stack, goal_sn, grade, embankment_cost, excavation_cost, profile)
+            profile.count("stacks_fitted")
+            if fitted is None:
+                profile.count("stacks_infeasible")
+                continue
+            cost, thicknesses = fitted
+            ranked.append((float(cost), int(row), make_section(stack, thicknesses)))
+    with profile.stage("rank"):
+        ranked.sort(key=lambda r: r[:2])
+    profile.count("sections_returned", len(ranked[:top_n]))
+    return ranked[:top_n]
@@ -0,0 +1,72 @@
+"""
+Incremental re-optimization for interactive edits.
+
+A SolveSession keeps the enumerated stacks and the fitted thicknesses of every stack
+between solves. Fits are keyed on the contents of the stack's materials and the problem
+(goal SN, grade, earthwork costs), so after an edit to one material only the stacks
+containing it are refitted and everything else is re-ranked from the stored fits. Keys
+are content based, so one session can be shared by every user of a worker.
+"""
+
+import solvesection
+from solveprofile import NULL_PROFILE
+
+
+def material_key(layer):
+    # everything about a material that affects stacking and fitting
+    return (layer.name, layer.sn, layer.cost_per_inch, layer.min_lift, layer.max_lift,
+            layer.surface_code, layer.subgrade_code, layer.alkaline_code)
+
+
+class SolveSession():
+    def __init__(self, max_layers=4):
+        self.max_layers = max_layers
+        self._structure = None
+        self._stack_index = None
+        self._fits = {}
+        self._previous_fits = {}
+        return None
+
+    def solve(self, material_table, goal_sn, grade=0.0, embankment_cost=0.0, excavation_cost=0.0, top_n=3,
+              profile=NULL_PROFILE):
+        """
+        solvesection.solve, reusing the stacks and fits of earlier solves.
+
+        Fits of the last two solves are kept, so toggling a value back and forth is also free.
+        """
+        with profile.stage("materials"):
+            material_list = solvesection.make_material_list(material_table)
+            keys = [material_key(l) for l in material_list]
+        with profile.stage("enumerate"):
+            structure = tuple((l.name, l.surface_code, l.subgrade_code, l.alkaline_code) for l in material_list)
+            if structure != self._structure:
+                arrays = solvesection.MaterialArrays(material_list)
+                self._stack_index = solvesection.enumerate_stack_index(arrays, self.max_layers, profile)
+                self._structure = structure
+            else:
+                profile.count("stacks_reused_enumeration", len(self._stack_index))
+        problem = (float(goal_sn), float(grade), float(embankment_cost), float(excavation_cost))
+        fits = {}
+        ranked = []
+        missing = object()
+        with profile.stage("fit"):
+            for row, stack_row in enumerate(self._stack_index):
+                stack = [material_list[i] for i in stack_row if i >= 0]
+                key = (tuple(keys[i] for i in stack_row if i >= 0), problem)
+                fitted = self._fits.get(key, missing)
+                if fitted is missing:
+                    fitted = self._previous_fits.get(key, missing)
+                if fitted is missing:
+                    fitted = solvesection.fit_stack(stack, *problem, profile=profile)
+                    profile.count("stacks_fitted")
+                else:
+                    profile.count("stacks_reused")
+                fits[key] = fitted
+                if fitted is not None:
+                    ranked.append((float(fitted[0]), row, stack, fitted[1]))
+        self._previous_fits, self._fits = self._fits, fits
+        with profile.stage("rank"):
+            ranked.sort(key=lambda r: r[:2])
+        sections = [solvesection.make_section(stack, thicknesses) for _cost, _row, stack, thicknesses in ranked[:top_n]]
+        profile.count("sections_returned", len(sections))
+        return sections
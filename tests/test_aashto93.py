@@ -1,6 +1,7 @@
 # a test suite for the function in aashto93.py
 
 import unittest
+import numpy as np
 import aashto93
 
 class CoreTest(unittest.TestCase):
@@ -13,4 +14,29 @@ class CoreTest(unittest.TestCase):
 
     def test_flexible_equivalent_single_axle_load(self):
         self.assertAlmostEqual(7.9, aashto93.flexible_equivalent_single_axle_load(30000, 1, 2.5, 3), delta=0.1)
-        self.assertAlmostEqual(2.08, aashto93.flexible_equivalent_single_axle_load(40000, 2, 2.5, 5), delta=0.1)
\ No newline at end of file
+        self.assertAlmostEqual(2.08, aashto93.flexible_equivalent_single_axle_load(40000, 2, 2.5, 5), delta=0.1)
+
+    def test_predict_pavement_esal_derivative(self):
+        h = 1e-6
+        numeric = (aashto93.predict_pavement_esal(0.9, 0.45, 4+h, 2.5, 3000) -
+                   aashto93.predict_pavement_esal(0.9, 0.45, 4-h, 2.5, 3000))/(2*h)
+        self.assertAlmostEqual(numeric/aashto93.predict_pavement_esal_derivative(0.9, 0.45, 4, 2.5, 3000), 1.0, delta=1e-6)
+
+    def test_solve_sn_array(self):
+        z = np.array([0.5, 0.9, 0.95])
+        so = 0.45
+        psi = np.array([[1.5], [2.5]])
+        esal = np.array([1e4, 1e5, 1e6])
+        sn, converged = aashto93.solve_sn(z, so, psi, 3000, esal, full_output=True)
+        self.assertEqual(sn.shape, (2, 3))
+        self.assertTrue(converged.all())
+        for i in range(2):
+            for j in range(3):
+                scalar, ok = aashto93.solve_sn(z[j], so, psi[i, 0], 3000, esal[j], full_output=True)
+                self.assertTrue(ok)
+                self.assertAlmostEqual(sn[i, j], scalar, delta=1e-6)
+
+    def test_solve_sn_without_traffic(self):
+        sn, converged = aashto93.solve_sn(np.array([0.9, 0.9]), 0.45, 2.5, 3000, np.array([0.0, 1e5]), full_output=True)
+        self.assertEqual(list(converged), [False, True])
+        self.assertFalse(aashto93.solve_sn_scalar(0.9, 0.45, 2.5, 3000, 0.0)[1])
@@ -0,0 +1,67 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+import app
+import catalog
+import corridor
+import solvesection
+
+
+def describe(sections):
+    return [[(l.name, l.thickness) for l in section] for section in sections]
+
+
+def supplier_catalog():
+    # every default material from five suppliers, each dearer or weaker than the last
+    table = []
+    for supplier, (cost, sn) in enumerate([(1.0, 1.0), (1.1, 1.0), (1.2, 0.95), (1.3, 0.95), (1.4, 0.9)]):
+        for row in app.Parametrization._material_table_defaults:
+            table.append(dict(row, mat_name=f"{row['mat_name']} #{supplier}", cost=row["cost"] * cost,
+                              sn=row["sn"] * sn))
+    return table
+
+
+class CoreTest(unittest.TestCase):
+    def test_unpruned_index_matches_solve(self):
+        table = app.Parametrization._material_table_defaults
+        index = catalog.CatalogIndex.build(table, prune=False)
+        for problem in ((5.0, 6.0, 10.0, 20.0), (7.0, 30.0, 50.0, 5.0), (4.0, -5.0, 20.0, 10.0), (3.0, 40.0, 150.0, 20.0)):
+            self.assertEqual(describe(index.solve(*problem)), describe(solvesection.solve(table, *problem)))
+        self.assertEqual(describe(index.solve(5.0, top_n=None)), describe(solvesection.solve(table, 5.0, top_n=None)))
+
+    def test_pruned_index_keeps_top_n(self):
+        table = supplier_catalog()
+        index = catalog.CatalogIndex.build(table, top_n=2, max_layers=2)
+        self.assertLess(len(index), len(table))
+        for problem in ((3.0, 6.0, 10.0, 20.0), (4.0, 30.0, 50.0, 5.0)):
+            expected = solvesection.solve(table, *problem, top_n=2, max_layers=2)
+            sections = index.solve(*problem, top_n=2, max_layers=2)
+            self.assertEqual([solvesection.section_cost(s, *problem[1:]) for s in sections],
+                             [solvesection.section_cost(s, *problem[1:]) for s in expected])
+        with self.assertRaises(ValueError):
+            index.solve(3.0, top_n=2, max_layers=3)
+
+    def test_lower_bounds(self):
+        index = catalog.CatalogIndex.build(app.Parametrization._material_table_defaults, prune=False)
+        for problem in ((5.0, 6.0, 10.0, 20.0), (7.0, 30.0, 50.0, 5.0), (4.0, -5.0, 20.0, 10.0), (3.0, 40.0, 150.0, 20.0)):
+            for n in range(1, 5):
+                sets = index.stack_sets(n)
+                bounds = index.lower_bounds(np.pad(sets, ((0, 0), (0, 4 - n)), constant_values=-1), *problem)
+                for row, bound in zip(sets, bounds):
+                    stack = solvesection.order_stack([index.material_list[i] for i in row])
+                    fitted = solvesection.fit_stack(stack, *problem)
+                    if fitted is not None:
+                        self.assertLessEqual(bound, fitted[0] + 1e-9)
+
+    def test_save_and_load(self):
+        index = catalog.CatalogIndex.build(supplier_catalog())
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "region.index.json"
+            index.save(path)
+            loaded = corridor.Catalogs(directory)["region"]
+        self.assertIsInstance(loaded, catalog.CatalogIndex)
+        self.assertEqual(loaded.kept.tolist(), index.kept.tolist())
+        self.assertEqual(describe(loaded.solve(5.0, 6.0, 10.0, 20.0)), describe(index.solve(5.0, 6.0, 10.0, 20.0)))
@@ -0,0 +1,103 @@
+import csv
+import importlib.util
+import json
+import tempfile
+import unittest
+from unittest import mock
+from pathlib import Path
+
+import app
+import corridor
+import solvesection
+
+
+class CoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        root = Path(self.directory.name)
+        (root / "catalogs").mkdir()
+        (root / "catalogs" / "default.json").write_text(json.dumps(app.Parametrization._material_table_defaults))
+        self.segments = root / "segments.csv"
+        with open(self.segments, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["segment", "adt", "trucks", "typical_profile_height", "goal_sn", "catalog"])
+            writer.writeheader()
+            for i in range(7):
+                writer.writerow({"segment": f"S{i}", "adt": 500 + 1000 * i, "trucks": 5,
+                                 "typical_profile_height": i - 3, "goal_sn": "" if i % 2 else 4.0, "catalog": "default"})
+        self.root = root
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_run(self):
+        output = self.root / "designs.jsonl"
+        self.assertEqual(corridor.run(self.segments, self.root / "catalogs", output, chunk_size=3), 7)
+        results = [json.loads(line) for line in output.read_text().splitlines()]
+        self.assertEqual([r["segment"] for r in results], [f"S{i}" for i in range(7)])
+        self.assertEqual(results[0]["goal_sn"], 4.0)
+        self.assertEqual(results[1]["goal_sn"], results[1]["structural_number"])
+        expected = solvesection.solve(app.Parametrization._material_table_defaults, 4.0, -3.0, 10.0, 20.0)
+        self.assertEqual([[l["name"] for l in s["layers"]] for s in results[0]["sections"]],
+                         [[l.name for l in s] for s in expected])
+
+    def test_run_workers(self):
+        for workers in (1, 2):
+            corridor.run(self.segments, self.root / "catalogs", self.root / f"{workers}.jsonl", chunk_size=3,
+                         workers=workers)
+        self.assertEqual((self.root / "2.jsonl").read_text(), (self.root / "1.jsonl").read_text())
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "requires pyarrow")
+    def test_parquet_segments(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        with open(self.segments, newline="") as f:
+            rows = list(csv.DictReader(f))
+        columns = {name: [row[name] for row in rows] for name in rows[0]}
+        for name in ("adt", "trucks", "typical_profile_height"):
+            columns[name] = [int(v) for v in columns[name]]
+        columns["goal_sn"] = [float(v) if v else None for v in columns["goal_sn"]]
+        pq.write_table(pa.table(columns), self.root / "segments.parquet", row_group_size=3)
+        records = list(corridor.read_segments(self.root / "segments.parquet", batch_size=2))
+        self.assertEqual(len(records), 7)
+        self.assertIsNone(records[1]["goal_sn"])
+        for name in ("segments.csv", "segments.parquet"):
+            corridor.run(self.root / name, self.root / "catalogs", self.root / f"{name}.jsonl", chunk_size=3)
+        self.assertEqual((self.root / "segments.parquet.jsonl").read_text(),
+                         (self.root / "segments.csv.jsonl").read_text())
+
+    def test_unconverged_segment(self):
+        catalogs = corridor.Catalogs(self.root / "catalogs")
+        records = [{"segment": "none", "adt": 0, "catalog": "default"},
+                   {"segment": "given", "adt": 0, "goal_sn": 4.0, "catalog": "default"},
+                   {"segment": "busy", "adt": 5000, "catalog": "default"}]
+        results = corridor.design_chunk(records, catalogs)
+        self.assertEqual([r["converged"] for r in results], [False, False, True])
+        self.assertIsNone(results[0]["structural_number"])
+        self.assertIsNone(results[0]["goal_sn"])
+        self.assertEqual(results[0]["sections"], [])
+        self.assertEqual(len(results[1]["sections"]), 3)
+        self.assertEqual(results[2]["goal_sn"], results[2]["structural_number"])
+        self.assertEqual(len(results[2]["sections"]), 3)
+
+    def test_resume(self):
+        output = self.root / "designs.csv"
+        checkpoint = self.root / "designs.ckpt"
+        corridor.run(self.segments, self.root / "catalogs", output, chunk_size=3)
+        complete = output.read_text()
+        output.unlink()
+        design_chunk = corridor.design_chunk
+        calls = []
+
+        def interrupted(*args):
+            calls.append(args)
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+            return design_chunk(*args)
+
+        with mock.patch.object(corridor, "design_chunk", interrupted):
+            with self.assertRaises(KeyboardInterrupt):
+                corridor.run(self.segments, self.root / "catalogs", output, checkpoint, chunk_size=3)
+        with open(output, "a") as f:
+            f.write("partial")
+        self.assertEqual(corridor.run(self.segments, self.root / "catalogs", output, checkpoint, chunk_size=3), 4)
+        self.assertEqual(output.read_text(), complete)
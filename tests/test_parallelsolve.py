@@ -0,0 +1,32 @@
+import unittest
+
+import app
+import parallelsolve
+import solvesection
+
+
+def describe(sections):
+    return [[(l.name, l.thickness) for l in section] for section in sections]
+
+
+class CoreTest(unittest.TestCase):
+    def test_solve_parallel_matches_solve(self):
+        table = app.Parametrization._material_table_defaults
+        expected = solvesection.solve(table, 5.0, 6.0, 10.0, 20.0, top_n=None)
+        for shards in (1, 3, 7):
+            sections = parallelsolve.solve_parallel(table, 5.0, 6.0, 10.0, 20.0, top_n=None, workers=2, shards=shards)
+            self.assertEqual(describe(sections), describe(expected))
+
+    def test_solve_many(self):
+        table = app.Parametrization._material_table_defaults
+        jobs = [(table, 4.0, 0.0, 10.0, 20.0), dict(material_table=table, goal_sn=6.0, grade=-3.0)]
+        results = parallelsolve.solve_many(jobs, workers=2)
+        self.assertEqual(describe(results[0]), describe(solvesection.solve(*jobs[0])))
+        self.assertEqual(describe(results[1]), describe(solvesection.solve(**jobs[1])))
+
+    def test_solve_many_named_catalogs(self):
+        table = app.Parametrization._material_table_defaults
+        jobs = [("default", 4.0, 0.0, 10.0, 20.0), dict(material_table="default", goal_sn=6.0, grade=-3.0)]
+        results = parallelsolve.solve_many(jobs, workers=2, catalogs={"default": table})
+        self.assertEqual(describe(results[0]), describe(solvesection.solve(table, 4.0, 0.0, 10.0, 20.0)))
+        self.assertEqual(describe(results[1]), describe(solvesection.solve(table, 6.0, -3.0)))
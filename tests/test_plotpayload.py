@@ -0,0 +1,43 @@
+import unittest
+
+import numpy as np
+import plotly.graph_objects as go
+
+import plotpayload
+
+
+def cloud(n, seed=0):
+    rng = np.random.default_rng(seed)
+    sn = rng.uniform(1, 8, n)
+    return sn, 10 * sn + rng.gamma(2, 5, n)
+
+
+class CoreTest(unittest.TestCase):
+    def test_pareto_mask(self):
+        sn, cost = cloud(300)
+        beaten = [((sn >= s) & (cost < c)).any() or ((sn > s) & (cost <= c)).any() for s, c in zip(sn, cost)]
+        np.testing.assert_array_equal(plotpayload.pareto_mask(sn, cost), ~np.array(beaten))
+
+    def test_downsample_keeps_extremes_and_front(self):
+        sn, cost = cloud(20_000)
+        kept = plotpayload.downsample(sn, cost, budget=1000)
+        self.assertLessEqual(len(kept), 1000)
+        for column in (sn, cost):
+            self.assertIn(np.argmin(column), kept)
+            self.assertIn(np.argmax(column), kept)
+        self.assertTrue(np.isin(np.flatnonzero(plotpayload.pareto_mask(sn, cost)), kept).all())
+        np.testing.assert_array_equal(plotpayload.downsample(sn[:500], cost[:500], budget=1000), np.arange(500))
+
+    def test_payload_size_is_bounded(self):
+        sizes = []
+        for n in (2_000, 200_000):
+            figure = go.Figure()
+            for trace in plotpayload.point_cloud_traces(*cloud(n), text=lambda i: f"section {i}", budget=1000):
+                figure.add_trace(trace)
+            payload = figure.to_json()
+            # plain lists, whatever the Plotly version
+            self.assertNotIn("bdata", payload)
+            self.assertTrue(all(trace.type in ("scattergl", "heatmap") for trace in figure.data))
+            sizes.append(len(payload))
+        self.assertLess(sizes[1], 2 * sizes[0])
+        self.assertLess(sizes[1], 100_000)
@@ -0,0 +1,46 @@
+import unittest
+
+import numpy as np
+
+import aashto93
+import app
+import reliability
+import solvesection
+import traffic
+
+TRAFFIC = (2000.0, 20, 0.02, 0.05, 0.5, 1.0, 1.0)
+
+
+class CoreTest(unittest.TestCase):
+    def test_model_error_only(self):
+        # designed for 95% reliability, with the model error as the only spread
+        esal = traffic.design_esals(*TRAFFIC)[0]
+        goal_sn = aashto93.solve_sn(-1.645, 0.45, 2.5, 3000.0, esal)
+        layer = solvesection.make_material_list(app.Parametrization._material_table_defaults)[0]
+        layer.thickness = goal_sn / layer.sn
+        result = reliability.failure_probability([solvesection.Section([layer])], *TRAFFIC, 2.5, 3000.0, 0.45,
+                                                 growth_sd=0.0, trucks_cov=0.0, mr_cov=0.0, coefficient_cov=0.0,
+                                                 batch_size=20_000, relative_tolerance=0.02, rng=0)
+        self.assertTrue(result.converged.all())
+        self.assertLess(result.samples, 1_000_000)
+        self.assertLess(result.lower[0], 0.05)
+        self.assertGreater(result.upper[0], 0.05)
+        self.assertAlmostEqual(result.margin_mean[0], 1.645 * 0.45, delta=0.01)
+
+    def test_sections_and_budget(self):
+        sections = solvesection.solve(app.Parametrization._material_table_defaults, 4.0, top_n=5)
+        result = reliability.failure_probability(sections, *TRAFFIC, 2.5, 3000.0, 0.45, max_samples=25_000,
+                                                 batch_size=10_000, tolerance=0.0, relative_tolerance=0.0, rng=1)
+        self.assertEqual(result.samples, 25_000)
+        self.assertFalse(result.converged.any())
+        self.assertEqual(len(result.as_dicts()), 5)
+        self.assertTrue(((result.lower <= result.failure_probability) & (result.failure_probability <= result.upper)).all())
+
+    def test_streaming_statistics(self):
+        margin = np.random.default_rng(2).normal(0.3, 0.5, (10_000, 3))
+        statistics = reliability.FailureStatistics(3)
+        for batch in np.array_split(margin, 7):
+            statistics.update(batch)
+        np.testing.assert_array_equal(statistics.failures, (margin < 0).sum(axis=0))
+        np.testing.assert_allclose(statistics.margin_mean, margin.mean(axis=0))
+        np.testing.assert_allclose(statistics.margin_sd, margin.std(axis=0, ddof=1))
@@ -0,0 +1,38 @@
+import tempfile
+import unittest
+
+import resultcache
+
+
+class CoreTest(unittest.TestCase):
+    def test_make_key(self):
+        table = [{"mat_name": "Base", "sn": 0.13, "min": 2}]
+        same = [{"min": 2.0, "sn": 0.13, "mat_name": "Base"}]
+        self.assertEqual(resultcache.make_key("solve", table, 5), resultcache.make_key("solve", same, 5.0))
+        self.assertNotEqual(resultcache.make_key("solve", table, 5), resultcache.make_key("solve", table, 5.1))
+
+    def test_lru_eviction(self):
+        cache = resultcache.ResultCache(max_entries=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get_or_compute("c", lambda: self.fail("should be cached")), 3)
+        self.assertEqual(cache.stats()["hits"], 2)
+        self.assertEqual(cache.stats()["misses"], 1)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_size_eviction(self):
+        cache = resultcache.ResultCache(max_bytes=1500)
+        cache.put("a", b"x" * 1000)
+        cache.put("b", b"y" * 1000)
+        self.assertNotIn("a", cache)
+        self.assertIn("b", cache)
+
+    def test_directory_backend(self):
+        with tempfile.TemporaryDirectory() as directory:
+            resultcache.ResultCache(directory=directory).put("a", [1.0, 2.0])
+            restarted = resultcache.ResultCache(directory=directory)
+            self.assertEqual(restarted.get("a"), [1.0, 2.0])
+            self.assertEqual(restarted.hits, 1)
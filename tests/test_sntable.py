@@ -0,0 +1,45 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+import aashto93
+import sntable
+
+
+class CoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / "sn_table.npy"
+        sntable.build_table(u_range=(3.0, 10.0), u_step=0.02, psi_range=(1.5, 3.5), psi_step=0.1).save(self.path)
+
+    def tearDown(self):
+        sntable._tables.pop(self.path, None)
+        self.directory.cleanup()
+
+    def test_interpolation_within_bound(self):
+        table = sntable.load_table(self.path)
+        self.assertIsInstance(table.values, np.memmap)
+        z = np.array([0.5, 0.9, 0.95, 0.99])
+        psi = np.array([1.7, 2.0, 2.5, 3.1])
+        mr = np.array([3000, 5000, 15000, 30000])
+        esal = np.array([1e4, 2e5, 3e6, 4e7])
+        sn = sntable.solve_sn(z, 0.45, psi, mr, esal, path=self.path)
+        exact = aashto93.solve_sn(z, 0.45, psi, mr, esal)
+        self.assertLessEqual(np.abs(sn - exact).max(), table.error_bound)
+
+    def test_fallback_outside_table(self):
+        sn = sntable.solve_sn(0.95, 0.45, 4.0, 3000, 1e5, path=self.path)
+        self.assertAlmostEqual(sn, aashto93.solve_sn(0.95, 0.45, 4.0, 3000, 1e5))
+        sn = sntable.solve_sn(0.95, 0.45, np.array([2.5, 4.0]), 3000, 1e5, path=self.path)
+        self.assertAlmostEqual(sn[1], aashto93.solve_sn(0.95, 0.45, 4.0, 3000, 1e5), delta=1e-6)
+
+    def test_missing_table(self):
+        missing = Path(self.directory.name) / "missing.npy"
+        self.assertAlmostEqual(sntable.solve_sn(0.95, 0.45, 2.5, 3000, 1e5, path=missing),
+                               aashto93.solve_sn(0.95, 0.45, 2.5, 3000, 1e5))
+        self.assertNotIn(missing, sntable._tables)
+        sntable.build_table(u_range=(3.0, 10.0), u_step=0.02, psi_range=(1.5, 3.5), psi_step=0.1).save(missing)
+        self.assertIsNotNone(sntable.load_table(missing))
+        sntable._tables.pop(missing)
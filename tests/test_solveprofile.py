@@ -0,0 +1,16 @@
+import unittest
+
+import app
+import solveprofile
+import solvesection
+
+
+class CoreTest(unittest.TestCase):
+    def test_solve_profile(self):
+        profile = solveprofile.SolveProfile()
+        sections = solvesection.solve(app.Parametrization._material_table_defaults, 5.0, top_n=None, profile=profile)
+        report = profile.as_dict()
+        self.assertEqual(set(report["stages"]), {"materials", "enumerate", "fit", "rank"})
+        self.assertEqual(report["counts"]["sections_returned"], len(sections))
+        self.assertEqual(report["counts"]["stacks_fitted"], report["counts"]["valid_stacks"])
+        self.assertEqual(report["counts"]["stacks_fitted"] - report["counts"]["stacks_infeasible"], len(sections))
@@ -1,5 +1,6 @@
 
 import unittest
+import numpy as np
 import solvesection
 import app
 
@@ -11,3 +12,82 @@ class CoreTest(unittest.TestCase):
         self.assertTrue(len(top_3) == 3)
         for section in top_3:
             self.assertAlmostEqual(solvesection.section_sn(section), goal_sn, delta=0.1)
+
+    def test_solve_is_deterministic(self):
+        table = app.Parametrization._material_table_defaults
+        first = solvesection.solve(table, 5.0, 6.0, 10.0, 20.0, top_n=None)
+        second = solvesection.solve(table, 5.0, 6.0, 10.0, 20.0, top_n=None)
+        self.assertEqual([[(l.name, l.thickness) for l in s] for s in first],
+                         [[(l.name, l.thickness) for l in s] for s in second])
+        costs = [solvesection.section_cost(s, 6.0, 10.0, 20.0) for s in first]
+        self.assertEqual(costs, sorted(costs))
+        for section in first:
+            self.assertTrue(solvesection.validate_section(section))
+            self.assertGreaterEqual(solvesection.section_sn(section), 5.0 - 1e-9)
+
+    def test_fit_stack(self):
+        layers = solvesection.make_material_list(app.Parametrization._material_table_defaults)
+        stack = solvesection.order_stack([layers[2], layers[0]])
+        self.assertEqual([l.name for l in stack], [layers[0].name, layers[2].name])
+        cost, thicknesses = solvesection.fit_stack(stack, 3.0)
+        # cheapest way to reach SN 3.0 is the thinnest surface over a thick base
+        self.assertEqual(list(thicknesses), [1.5, 18.0])
+        self.assertIsNone(solvesection.order_stack([layers[2]]))
+
+    def test_solve_high_embankment(self):
+        # materials cheaper than the fill they displace: compare against every thickness up to 48in
+        table = app.Parametrization._material_table_defaults
+        problem = (3.0, 40.0, 150.0, 20.0)
+        reference = []
+        for stack in solvesection.enumerate_stacks(solvesection.make_material_list(table), 2):
+            grids = []
+            for l in stack:
+                grid = np.arange(l.min_lift, 48.0 + 1e-9, 0.5 if l.min_lift < 2.0 else 1.0)
+                grids.append(grid[solvesection.valid_lift(grid, l.min_lift, l.max_lift)])
+            thickness = np.array(np.meshgrid(*grids, indexing="ij")).reshape(len(stack), -1).T
+            reaches = thickness @ [l.sn for l in stack] >= problem[0] - 1e-9
+            if reaches.any():
+                fill = problem[1] - thickness[reaches].sum(axis=1)
+                earthwork = np.where(fill > 0, problem[2], problem[3]) / 36 * fill
+                reference.append((thickness[reaches] @ [l.cost_per_inch for l in stack] + earthwork).min())
+        sections = solvesection.solve(table, *problem, max_layers=2)
+        costs = [solvesection.section_cost(s, *problem[1:]) for s in sections]
+        self.assertTrue(np.allclose(costs, sorted(reference)[:3]))
+
+    def test_unbounded_excavation_credit(self):
+        # thickening pit run costs less than the excavation it credits
+        pit_run = {"mat_name": "Pit Run", "sn": 0.08, "min": 4.0, "max": 12.0, "density": 120.0, "cost": 10.0,
+                   "unit": "ton", "surface": "No", "subgrade": "No", "alkaline": "No"}
+        table = app.Parametrization._material_table_defaults + [pit_run]
+        with self.assertRaises(ValueError):
+            solvesection.solve(table, 4.0, 0.0, 10.0, 20.0)
+        with self.assertRaises(ValueError):
+            solvesection.solve_frontier(table, [3.0, 4.0], 0.0, 10.0, 20.0)
+        self.assertEqual(len(solvesection.solve(table, 4.0, 0.0, 10.0, 10.0)), 3)
+
+    def test_batch_matches_layers(self):
+        arrays = solvesection.compile_materials(app.Parametrization._material_table_defaults)
+        index = solvesection.random_sections(arrays, 500, rng=0)
+        thickness = solvesection.batch_modify_thickness(arrays, index, solvesection.initial_thickness(arrays, index), 5.0)
+        sections = solvesection.to_sections(arrays, index, solvesection.initial_thickness(arrays, index))
+        sections = [solvesection.modify_thickness(s, 5.0) for s in sections]
+        for i, section in enumerate(sections):
+            self.assertEqual([l.thickness for l in section], list(thickness[i, :len(section)]))
+        self.assertTrue(np.allclose(solvesection.batch_section_sn(arrays, index, thickness),
+                                    [solvesection.section_sn(s) for s in sections]))
+        self.assertTrue(np.allclose(solvesection.batch_section_cost(arrays, index, thickness, 6.0, 10.0, 20.0),
+                                    [solvesection.section_cost(s, 6.0, 10.0, 20.0) for s in sections]))
+        self.assertEqual(list(solvesection.batch_validate_section(arrays, index, thickness)),
+                         [solvesection.validate_section(s) for s in sections])
+
+    def test_solve_frontier(self):
+        table = app.Parametrization._material_table_defaults
+        sn_values = [2.0, 3.3, 5.0, 6.8, 8.0]
+        frontier = solvesection.solve_frontier(table, sn_values, 6.0, 10.0, 20.0)
+        self.assertEqual([sn for sn, _, _ in frontier], sn_values)
+        for sn, cost, section in frontier:
+            best = solvesection.solve(table, sn, 6.0, 10.0, 20.0, top_n=1)[0]
+            self.assertAlmostEqual(cost, solvesection.section_cost(best, 6.0, 10.0, 20.0))
+            self.assertAlmostEqual(cost, solvesection.section_cost(section, 6.0, 10.0, 20.0))
+            self.assertGreaterEqual(solvesection.section_sn(section), sn - 1e-9)
+            self.assertTrue(solvesection.validate_section(section))
@@ -0,0 +1,47 @@
+import unittest
+
+import app
+import solveprofile
+import solvesection
+import solvesession
+
+
+def describe(sections):
+    return [[(l.name, l.thickness) for l in section] for section in sections]
+
+
+class CoreTest(unittest.TestCase):
+    def test_edits_match_solve(self):
+        table = [dict(row) for row in app.Parametrization._material_table_defaults]
+        session = solvesession.SolveSession()
+        session.solve(table, 5.0, 6.0, 10.0, 20.0)
+        edits = [
+            lambda t: t[2].update(cost=20.0),
+            lambda t: t[3].update(min=12.0),
+            lambda t: t.append(dict(t[0], mat_name="Asphalt Surface (3/8in)", cost=125.0)),
+        ]
+        for edit in edits:
+            edit(table)
+            profile = solveprofile.SolveProfile()
+            sections = session.solve(table, 5.0, 6.0, 10.0, 20.0, top_n=None, profile=profile)
+            self.assertEqual(describe(sections), describe(solvesection.solve(table, 5.0, 6.0, 10.0, 20.0, top_n=None)))
+        sections = session.solve(table, 5.5, 6.0, 10.0, 20.0, top_n=None)
+        self.assertEqual(describe(sections), describe(solvesection.solve(table, 5.5, 6.0, 10.0, 20.0, top_n=None)))
+
+    def test_cost_edit_refits_affected_stacks(self):
+        table = [dict(row) for row in app.Parametrization._material_table_defaults]
+        session = solvesession.SolveSession()
+        session.solve(table, 5.0)
+        table[2]["cost"] = 20.0
+        profile = solveprofile.SolveProfile()
+        session.solve(table, 5.0, profile=profile)
+        affected = sum(table[2]["mat_name"] in [l.name for l in stack]
+                       for stack in solvesection.enumerate_stacks(solvesection.make_material_list(table)))
+        self.assertEqual(profile.counts["stacks_fitted"], affected)
+        self.assertEqual(profile.counts["stacks_fitted"] + profile.counts["stacks_reused"],
+                         profile.counts["stacks_reused_enumeration"])
+        # switching back is answered from the previous fits
+        table[2]["cost"] = 35.0
+        profile = solveprofile.SolveProfile()
+        session.solve(table, 5.0, profile=profile)
+        self.assertNotIn("stacks_fitted", profile.counts)
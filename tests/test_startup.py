@@ -0,0 +1,29 @@
+import json
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def loaded_after(code):
+    # heavy packages loaded by running code in a fresh interpreter
+    probe = code + "\nimport json, sys\nprint(json.dumps([m for m in ('scipy', 'plotly', 'pandas') if m in sys.modules]))"
+    output = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+class CoreTest(unittest.TestCase):
+    def test_traffic_and_design_need_only_numpy(self):
+        code = "\n".join([
+            "import aashto93, loadspectrum, sntable, solvesection, traffic",
+            "esal = aashto93.trips_to_esals(aashto93.total_trips(1000, 20, 0.02) * 0.05, 0.5, 1.0, 1.0)",
+            "sn = aashto93.solve_sn(0.95, 0.45, 2.5, 3000, esal)",
+            "sn = sntable.solve_sn(0.95, 0.45, 2.5, 3000, esal, path='missing.npy')",
+            "assert 2 < sn < 4",
+        ])
+        self.assertEqual(loaded_after(code), [])
+
+    def test_app_defers_plotting(self):
+        self.assertEqual([m for m in loaded_after("import app") if m != "scipy"], [])
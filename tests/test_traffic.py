@@ -0,0 +1,47 @@
+import unittest
+
+import numpy as np
+
+import aashto93
+import traffic
+
+
+def yearly_total_trips(adt, years, growth):
+    # the per-year sum total_trips used to build
+    return np.sum(np.full(years, 365 * adt) * np.array([(1 + growth)**y for y in range(years)]))
+
+
+class CoreTest(unittest.TestCase):
+    def test_total_trips_closed_form(self):
+        for adt, years, growth in ((1000.0, 20, 0.02), (500.0, 1, 0.05), (250.0, 35, 0.0), (2500.0, 30, -0.01)):
+            self.assertAlmostEqual(aashto93.total_trips(adt, years, growth) / yearly_total_trips(adt, years, growth),
+                                   1.0, places=12)
+        self.assertEqual(aashto93.total_trips(1000.0, 0, 0.02), 0.0)
+
+    def test_segments(self):
+        rng = np.random.default_rng(0)
+        adt = rng.uniform(100, 20000, 50)
+        years = rng.integers(1, 40, 50)
+        growth = rng.uniform(0, 0.05, 50)
+        growth[::5] = 0.0
+        annual = traffic.annual_trips(adt, years, growth)
+        self.assertEqual(annual.shape, (50, years.max()))
+        expected = [yearly_total_trips(a, y, g) for a, y, g in zip(adt, years, growth)]
+        np.testing.assert_allclose(traffic.total_trips(adt, years, growth), expected, rtol=1e-12)
+        np.testing.assert_allclose(annual.sum(axis=1), expected, rtol=1e-12)
+        esals = traffic.design_esals(adt, years, growth, 0.05, 0.5, np.linspace(0.6, 1.0, 50), 1.2)
+        expected_esals = aashto93.trips_to_esals(np.array(expected) * 0.05, 0.5, np.linspace(0.6, 1.0, 50), 1.2)
+        np.testing.assert_allclose(esals, expected_esals, rtol=1e-12)
+        np.testing.assert_allclose(traffic.annual_esals(adt, years, growth, 0.05, 0.5, np.linspace(0.6, 1.0, 50),
+                                                        1.2).sum(axis=1), expected_esals, rtol=1e-12)
+
+    def test_growth_schedule(self):
+        rates = np.array([[0.04, 0.02, 0.0], [0.03, 0.03, 0.03]])
+        factors = traffic.growth_factors([20, 12], rates, [0, 5, 15])
+        np.testing.assert_allclose(factors[0, :6], 1.04**np.minimum(np.arange(6), 5) * 1.02**np.maximum(np.arange(6) - 5, 0))
+        np.testing.assert_allclose(factors[0, 15:], np.full(5, 1.04**5 * 1.02**10))
+        np.testing.assert_allclose(factors[1, :12], 1.03**np.arange(12))
+        self.assertTrue((factors[1, 12:] == 0).all())
+        np.testing.assert_allclose(traffic.growth_sums([20, 12], rates, [0, 5, 15]), factors.sum(axis=1), rtol=1e-12)
+        with self.assertRaises(ValueError):
+            traffic.growth_factors(20, rates)
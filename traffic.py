@@ -0,0 +1,106 @@
+"""
+Traffic projection for many street segments at once.
+
+Every argument is a scalar or an array with one entry per segment: ADT, service years,
+truck share, directional and lane distribution factors (fractions, not percent) and load
+equivalency factor. Growth is a constant annual rate per segment, or a piecewise schedule:
+rates of shape (segments, periods) with starts giving the first year of each period
+(starts[0] == 0), either shared by every segment (periods,) or per segment. Traffic
+grows from year y to y + 1 at the rate of the period that year y is in.
+
+Per-year arrays have one column per service year of the longest segment, and years past
+a segment's own service life are zero. Totals use closed form geometric sums and never
+build the per-year arrays.
+"""
+import numpy as np
+
+import aashto93
+
+
+def growth_schedule(growth, starts=None, segments=1):
+    """
+    Rates and start years of a growth schedule, both shaped (segments, periods).
+    """
+    rates = np.asarray(growth, dtype=float)
+    if rates.ndim < 2:
+        rates = rates.reshape(-1, 1)
+    if starts is None:
+        if rates.shape[1] != 1:
+            raise ValueError("a piecewise growth schedule needs the start year of every period")
+        starts = np.zeros(1)
+    starts = np.asarray(starts, dtype=float)
+    shape = (max(segments, len(rates), len(starts) if starts.ndim == 2 else 1), rates.shape[1])
+    starts = np.broadcast_to(starts, shape)
+    if (starts[:, 0] != 0).any() or (np.diff(starts, axis=1) <= 0).any():
+        raise ValueError("growth periods must start at year 0 and in increasing order")
+    return np.broadcast_to(rates, shape), starts
+
+
+def _segments(*values):
+    return max(np.size(v) if np.ndim(v) <= 1 else len(v) for v in values)
+
+
+def growth_factors(years, growth, starts=None):
+    """
+    Traffic of every year relative to year 0.
+
+    Returns:
+    ndarray: shape (segments, max(years)), zero past each segment's service life
+    """
+    years = np.asarray(years, dtype=int)
+    rates, starts = growth_schedule(growth, starts, _segments(years, growth))
+    year = np.arange(years.max() if years.size else 0)
+    period = (year[None, None, :] >= starts[:, :, None]).sum(axis=1) - 1
+    annual = np.log1p(np.take_along_axis(rates, period, axis=1))
+    # exclusive running product: year y has grown y times
+    exponent = np.cumsum(annual, axis=1) - annual
+    return np.where(year < years.reshape(-1, 1), np.exp(exponent), 0.0)
+
+
+def growth_sums(years, growth, starts=None):
+    """
+    Sum of growth_factors over the service life of every segment, in closed form.
+    """
+    years = np.asarray(years, dtype=float).reshape(-1, 1)
+    rates, starts = growth_schedule(growth, starts, _segments(years, growth))
+    ends = np.concatenate([starts[:, 1:], np.full((len(starts), 1), np.inf)], axis=1)
+    lengths = np.clip(np.minimum(ends, years) - starts, 0, None)
+    # growth factor at the start of each period
+    grown = np.log1p(rates) * np.where(np.isfinite(ends), ends - starts, 0.0)
+    start_factor = np.exp(np.cumsum(grown, axis=1) - grown)
+    return (start_factor * aashto93.geometric_sum(rates, lengths)).sum(axis=1)
+
+
+def annual_trips(adt, years, growth, starts=None):
+    """
+    Trips of every segment in every service year, shape (segments, max(years)).
+    """
+    return 365 * np.reshape(adt, (-1, 1)) * growth_factors(years, growth, starts)
+
+
+def total_trips(adt, years, growth, starts=None):
+    """
+    Trips of every segment over its service life; aashto93.total_trips with growth schedules.
+    """
+    return 365 * np.asarray(adt, dtype=float).ravel() * growth_sums(years, growth, starts)
+
+
+def annual_esals(adt, years, growth, trucks, direction_factor, lane_factor, equivalent_load, starts=None):
+    """
+    Design lane ESALs of every segment in every service year.
+
+    Returns:
+    ndarray: shape (segments, max(years))
+    """
+    column = lambda value: np.reshape(value, (-1, 1))
+    trips = annual_trips(adt, years, growth, starts) * column(trucks)
+    return aashto93.trips_to_esals(trips, column(direction_factor), column(lane_factor), column(equivalent_load))
+
+
+def design_esals(adt, years, growth, trucks, direction_factor, lane_factor, equivalent_load, starts=None):
+    """
+    Design lane ESALs of every segment over its service life, the row sums of annual_esals.
+    """
+    flat = lambda value: np.asarray(value, dtype=float).ravel()
+    trips = total_trips(adt, years, growth, starts) * flat(trucks)
+    return aashto93.trips_to_esals(trips, flat(direction_factor), flat(lane_factor), flat(equivalent_load))